@@ -0,0 +1,482 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import unicodedata
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import generate_boleto
+import generate_client_list
+import ledger
+import metrics
+import synthetic_data
+from exporters import COLUNAS_PROSPERAR, EXPORTADORES, exportar
+from mail_template import TemplateEmail, formatar_tabela_despesas, montar_html
+from mailer import Mensagem, montar_mensagem
+from member_groups import agrupar_socios
+
+
+def _socios_ficticios(n_socios: int, linhas_por_socio: int, seed: int = 42) -> list[pd.DataFrame]:
+    rng = random.Random(seed)
+    descricoes = ['Mensalidade', 'Fundo de Reforma', 'Tx Boleto', 'Contribuição Extra & Festa', 'Distribuição do Vegetal']
+    socios = []
+    for i in range(n_socios):
+        socios.append(pd.DataFrame({
+            'Nome': f'SÓCIO NÚMERO {i}',
+            'Vencimento': '10/12/2023',
+            'Descrição': [rng.choice(descricoes) for _ in range(linhas_por_socio)],
+            'Valor': [round(rng.uniform(1, 2500), 2) for _ in range(linhas_por_socio)],
+        }))
+    return socios
+
+
+def _render_original(df: pd.DataFrame, uuid: str) -> str:
+    tabela = formatar_tabela_despesas(df[['Descrição', 'Valor']], uuid=uuid)
+    return montar_html(df.Nome.values[0], df.Vencimento.values[0], tabela, df['Valor'].sum())
+
+
+def _render_compilado(df: pd.DataFrame, template: TemplateEmail) -> str:
+    return template.render(df.Nome.values[0], df.Vencimento.values[0], df['Descrição'].values, df['Valor'].values, df['Valor'].sum())
+
+
+def bench_render(n_socios: int = 200, linhas_por_socio: int = 4) -> dict:
+    # Compara o custo por sócio do caminho original (Styler + premailer) com o template compilado
+    socios = _socios_ficticios(n_socios, linhas_por_socio)
+
+    inicio = time.perf_counter()
+    template = TemplateEmail(otimizar=False)
+    compilacao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    originais = [_render_original(df, template.uuid) for df in socios]
+    original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    compilados = [_render_compilado(df, template) for df in socios]
+    compilado = time.perf_counter() - inicio
+
+    divergentes = sum(a != b for a, b in zip(originais, compilados))
+    resultado = {
+        'socios': n_socios,
+        'linhas_por_socio': linhas_por_socio,
+        'compilacao_ms': compilacao * 1e3,
+        'original_ms_por_socio': original / n_socios * 1e3,
+        'compilado_ms_por_socio': compilado / n_socios * 1e3,
+        'divergentes': divergentes,
+    }
+    print(f"Compilação do template: {resultado['compilacao_ms']:.1f} ms")
+    print(f"Original:  {resultado['original_ms_por_socio']:.3f} ms/sócio")
+    print(f"Compilado: {resultado['compilado_ms_por_socio']:.3f} ms/sócio")
+    print(f"HTML divergente em {divergentes} de {n_socios} sócios")
+    return resultado
+
+
+def _mensagem_original(html: str) -> str:
+    # Mensagem como era montada antes: só a parte HTML, em base64
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    msg = MIMEMultipart()
+    msg.attach(MIMEText(html, 'html'))
+    return msg.as_string()
+
+
+def bench_tamanho(n_socios: int = 200, linhas_por_socio: int = 4) -> dict:
+    # Bytes por email do HTML original e do otimizado, e da mensagem MIME enviada
+    socios = _socios_ficticios(n_socios, linhas_por_socio)
+    original = TemplateEmail(otimizar=False)
+    otimizado = TemplateEmail()
+
+    bytes_original = bytes_otimizado = mime_original = mime_otimizado = 0
+    for df in socios:
+        dados = (df.Nome.values[0], df.Vencimento.values[0], df['Descrição'].values, df['Valor'].values, df['Valor'].sum())
+        html_original = original.render(*dados)
+        html_otimizado = otimizado.render(*dados)
+        bytes_original += len(html_original.encode('utf-8'))
+        bytes_otimizado += len(html_otimizado.encode('utf-8'))
+        mime_original += len(_mensagem_original(html_original))
+        mime_otimizado += len(montar_mensagem('', Mensagem('', '', html_otimizado, otimizado.texto(*dados))).as_string())
+
+    resultado = {
+        'socios': n_socios,
+        'linhas_por_socio': linhas_por_socio,
+        'html_original_bytes': bytes_original / n_socios,
+        'html_otimizado_bytes': bytes_otimizado / n_socios,
+        'mensagem_original_bytes': mime_original / n_socios,
+        'mensagem_otimizada_bytes': mime_otimizado / n_socios,
+    }
+    print(f"HTML:     {resultado['html_original_bytes'] / 1024:6.1f} KB -> {resultado['html_otimizado_bytes'] / 1024:6.1f} KB por sócio")
+    print(f"Mensagem: {resultado['mensagem_original_bytes'] / 1024:6.1f} KB -> {resultado['mensagem_otimizada_bytes'] / 1024:6.1f} KB por sócio (com a parte em texto)")
+    return resultado
+
+
+def _planilha_ficticia(linhas: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({coluna: np.nan for coluna in COLUNAS_PROSPERAR}, index=range(linhas))
+    df['ID Externo*'] = [f'202312{i:0>3}' for i in range(1, linhas + 1)]
+    df['Nome Completo do Pagador (Sacado)*'] = [f'SÓCIO NÚMERO {i}' for i in range(linhas)]
+    df['E-mail*'] = [f'socio{i}@exemplo.com.br' for i in range(linhas)]
+    df['CPF/CNPJ*'] = rng.integers(10**10, 10**11, linhas).astype(str)
+    df['Rua*'] = 'Estrada João Mineiro'
+    df['Número*'] = rng.integers(1, 5000, linhas)
+    df['Bairro*'] = 'São Pedro'
+    df['Cidade*'] = 'Mairiporã'
+    df['Estado*'] = 'SP'
+    df['Cep*'] = rng.integers(10**7, 10**8, linhas).astype(str)
+    df['Vencimento*'] = '10/12/2023'
+    df['Valor (R$)*'] = rng.uniform(1, 2500, linhas).round(2)
+    return df
+
+
+def _medir_exportacao(formato: str, linhas: int) -> dict:
+    # Roda em um processo novo para o pico de memória ser só deste formato
+    df = _planilha_ficticia(linhas)
+    rss_inicial = metrics._pico_memoria_processo_mb()
+    with tempfile.TemporaryDirectory() as diretorio:
+        inicio = time.perf_counter()
+        caminho = exportar(df, os.path.join(diretorio, 'boletos'), formato)
+        duracao = time.perf_counter() - inicio
+        tamanho = os.path.getsize(caminho)
+    rss_final = metrics._pico_memoria_processo_mb()
+    return {
+        'formato': formato,
+        'linhas': linhas,
+        'segundos': duracao,
+        'bytes': tamanho,
+        'pico_rss_mb': rss_final,
+        'rss_extra_mb': rss_final - rss_inicial if rss_final is not None else None,
+    }
+
+
+def bench_export(linhas: int = 50_000, formatos=None) -> list[dict]:
+    # Compara tempo de escrita e pico de memória (RSS) entre os formatos de exportação
+    resultados = []
+    contexto = multiprocessing.get_context('spawn')
+    for formato in formatos or EXPORTADORES:
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+            resultado = executor.submit(_medir_exportacao, formato, linhas).result()
+        resultados.append(resultado)
+        memoria = 'pico RSS indisponível' if resultado['pico_rss_mb'] is None else (
+            f"pico RSS {resultado['pico_rss_mb']:7.1f} MB (+{resultado['rss_extra_mb']:.1f} MB na escrita)")
+        print(f"{formato:>9}: {resultado['segundos']:7.2f} s  {resultado['bytes'] / 1e6:7.1f} MB  {memoria}")
+    return resultados
+
+
+def _medir_etapa(nome: str, funcao, entrada, medir_memoria: bool) -> tuple:
+    inicio = time.perf_counter()
+    saida = funcao(entrada)
+    duracao = time.perf_counter() - inicio
+
+    # A memória é medida numa segunda execução, para o tracemalloc não distorcer o tempo
+    pico = None
+    if medir_memoria:
+        tracemalloc.start()
+        funcao(entrada)
+        pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    resultado = {
+        'etapa': nome,
+        'segundos': duracao,
+        'pico_memoria_mb': pico,
+        'linhas_entrada': len(entrada) if hasattr(entrada, '__len__') and not isinstance(entrada, str) else None,
+        'linhas_saida': len(saida) if hasattr(saida, '__len__') and not isinstance(saida, str) else None,
+    }
+    memoria = f'{pico:9.1f} MB' if pico is not None else ''
+    print(f'{nome:>8}: {duracao:8.3f} s {memoria}')
+    return saida, resultado
+
+
+def _renderizar_todos(df: pd.DataFrame) -> list[str]:
+    template = TemplateEmail()
+    df = df.rename(columns={'Data de vencimento': 'Vencimento', 'Cliente/Fornecedor': 'Nome'})
+    return [
+        template.render(grupo.nome, grupo.vencimento, grupo.descricoes, grupo.valores, grupo.total)
+        for grupo in agrupar_socios(df)
+    ]
+
+
+def bench_pipeline(linhas: int, socios: int, saida: str = 'benchmark_resultados.jsonl', medir_memoria: bool = True) -> dict:
+    # Roda cada etapa do pipeline sobre dados fictícios e acrescenta o resultado em JSON Lines
+    saida = os.path.abspath(saida)
+    diretorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as base:
+        synthetic_data.escrever_dataset(base, linhas, socios)
+        os.makedirs(os.path.join(base, 'code'))
+        # Os scripts usam caminhos relativos (../update, ../socios, ../boletos)
+        os.chdir(os.path.join(base, 'code'))
+        try:
+            etapas = []
+            _, r = _medir_etapa('socios', generate_client_list.generate_client_list, 'backup_cliente_20231129.csv', medir_memoria)
+            r['linhas_entrada'] = socios
+            etapas.append(r)
+
+            caminho = '../update/backup_granatum_20231129.csv'
+            df, r = _medir_etapa('load', lambda c: pd.read_csv(c, **ledger.OPCOES_CSV), caminho, medir_memoria)
+            etapas.append(r)
+            df, r = _medir_etapa('filter', ledger._filtrar_boletos, df, medir_memoria)
+            etapas.append(r)
+            df, r = _medir_etapa('merge', ledger.juntar_socios, df, medir_memoria)
+            etapas.append(r)
+            planilha, r = _medir_etapa('groupby', generate_boleto.montar_planilha_prosperar, df, medir_memoria)
+            etapas.append(r)
+            _, r = _medir_etapa('xlsx', lambda p: exportar(p, '../boletos/benchmark', 'xlsx'), planilha, medir_memoria)
+            etapas.append(r)
+            _, r = _medir_etapa('render', _renderizar_todos, df, medir_memoria)
+            etapas.append(r)
+        finally:
+            os.chdir(diretorio_original)
+
+    resultado = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'linhas': linhas,
+        'socios': socios,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'etapas': etapas,
+    }
+    with open(saida, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+    print(f'Resultados acrescentados em {saida}')
+    return resultado
+
+
+def _melhor_tempo(funcao, repeticoes: int) -> tuple:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        saida = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return saida, min(tempos)
+
+
+def bench_motor(linhas: int = 1_000_000, socios: int = 10_000, repeticoes: int = 3) -> dict:
+    # Compara o filtro, junção e agrupamento por sócio no pandas e no Polars,
+    # conferindo que a planilha de boletos sai idêntica
+    import polars_engine
+
+    diretorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as base:
+        synthetic_data.escrever_dataset(base, linhas, socios)
+        os.makedirs(os.path.join(base, 'code'))
+        os.chdir(os.path.join(base, 'code'))
+        try:
+            arquivo = 'backup_granatum_20231129.csv'
+            generate_client_list.generate_client_list('backup_cliente_20231129.csv')
+
+            esperado, t_pandas = _melhor_tempo(
+                lambda: generate_boleto.montar_planilha_prosperar(ledger._gerar_tabela_completa(arquivo)), repeticoes)
+
+            # A primeira execução inclui a conversão do backup para UTF-8 (feita uma vez por arquivo)
+            inicio = time.perf_counter()
+            polars_engine.gerar_tabela_boletos(arquivo)
+            t_primeira = time.perf_counter() - inicio
+            obtido, t_polars = _melhor_tempo(
+                lambda: generate_boleto.montar_planilha_prosperar(polars_engine.gerar_tabela_boletos(arquivo)), repeticoes)
+        finally:
+            os.chdir(diretorio_original)
+
+    pd.testing.assert_frame_equal(
+        esperado.reset_index(drop=True), obtido.reset_index(drop=True),
+        check_dtype=False, check_categorical=False, rtol=1e-9,
+    )
+    resultado = {
+        'linhas': linhas,
+        'boletos': len(esperado),
+        'pandas_segundos': t_pandas,
+        'polars_segundos': t_polars,
+        'polars_primeira_segundos': t_primeira,
+    }
+    print(f'{linhas} lançamentos, {len(esperado)} boletos idênticos nos dois motores')
+    print(f'  pandas: {t_pandas:7.2f} s')
+    print(f'  polars: {t_polars:7.2f} s ({t_pandas / t_polars:.1f}x; {t_primeira:.2f} s na primeira execução, com a conversão para UTF-8)')
+    return resultado
+
+
+def _sem_acento_minusculo(nome: str) -> str:
+    return unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode().lower()
+
+
+DESCRICAO_CASO_DE_BORDA = 'Caso de borda'
+
+
+def _acrescentar_casos_de_borda(arquivos: dict) -> None:
+    # Lançamentos que exercitam as regras da junção com os sócios: só pelo nome
+    # (documento vazio, grafia sem acento), nomes latin-1, titular e dependente
+    # com o mesmo documento e documento vazio sem sócio correspondente
+    socios = pd.read_csv(arquivos['socios'], sep=';', encoding='latin-1', dtype=str, keep_default_na=False)
+    lancamentos = pd.read_csv(arquivos['lancamentos'], sep=';', encoding='latin-1', dtype=str, keep_default_na=False)
+
+    novos_socios = socios.iloc[:4].copy()
+    novos_socios['Nome/Razão Social'] = ['JOSÉ DA CONCEIÇÃO ÁVILA', 'MARIA DO SOCORRO ASSUNÇÃO', 'ANTÔNIO PEREIRA LIMA', 'LUCAS PEREIRA LIMA']
+    novos_socios['CPF/CNPJ'] = ['111.444.777-35', '', '529.982.247-25', '529.982.247-25']
+    novos_socios['Email'] = ['jose@exemplo.com.br', 'maria@exemplo.com.br', 'antonio@exemplo.com.br', 'lucas@exemplo.com.br']
+    socios = pd.concat([socios, novos_socios], ignore_index=True)
+
+    existente = socios['Nome/Razão Social'].iloc[0]
+    casos = [
+        # (Cliente/Fornecedor, Documento, Valor)
+        (existente, '', '10,00'),                                   # só pelo nome
+        (_sem_acento_minusculo(existente), '', '20,00'),            # nome com outra grafia
+        ('JOSÉ DA CONCEIÇÃO ÁVILA', '111.444.777-35', '30,00'),     # latin-1, pelo documento
+        ('JOSÉ DA CONCEIÇÃO ÁVILA', '', '40,00'),                   # latin-1, só pelo nome
+        ('MARIA DO SOCORRO ASSUNÇÃO', '', '1.050,00'),              # sócio sem documento na lista
+        ('ANTÔNIO PEREIRA LIMA', '529.982.247-25', '70,00'),        # titular: documento + nome
+        ('LUCAS PEREIRA LIMA', '529.982.247-25', '80,00'),          # dependente com o documento do titular
+        ('DESCONHECIDO DA SILVA', '', '60,00'),                     # sem documento nem sócio: fica fora
+    ]
+    modelo = lancamentos.iloc[[0] * len(casos)].copy()
+    modelo['Cliente/Fornecedor'] = [c[0] for c in casos]
+    modelo['Documento cliente/fornecedor'] = [c[1] for c in casos]
+    modelo['Valor'] = [c[2] for c in casos]
+    modelo['Descrição'] = DESCRICAO_CASO_DE_BORDA
+    modelo['Forma de pagamento'] = 'Boleto ProsperarBank'
+    modelo['Categoria'] = '001 - Mensalidade'
+    lancamentos = pd.concat([lancamentos, modelo], ignore_index=True)
+
+    socios.to_csv(arquivos['socios'], sep=';', encoding='latin-1', index=False)
+    lancamentos.to_csv(arquivos['lancamentos'], sep=';', encoding='latin-1', index=False)
+
+
+def _comparavel(df: pd.DataFrame) -> pd.DataFrame:
+    # Categóricos do pandas viram texto e os vazios (None do Polars, NaN do pandas) ficam iguais
+    df = df.reset_index(drop=True).astype(object)
+    return df.where(df.notna(), None)
+
+
+def verificar_paridade(linhas: int = 2_000, socios: int = 200, seed: int = 7) -> dict:
+    # Conferência rápida e determinística de que o motor Polars produz a mesma
+    # tabela de lançamentos e a mesma planilha de boletos que o pandas, com
+    # os casos de borda da junção; levanta AssertionError na primeira diferença
+    import polars_engine
+
+    diretorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as base:
+        _acrescentar_casos_de_borda(synthetic_data.escrever_dataset(base, linhas, socios, seed=seed))
+        os.makedirs(os.path.join(base, 'code'))
+        os.chdir(os.path.join(base, 'code'))
+        try:
+            arquivo = 'backup_granatum_20231129.csv'
+            generate_client_list.generate_client_list('backup_cliente_20231129.csv')
+            tabela_pandas = ledger._gerar_tabela_completa(arquivo)
+            tabela_polars = polars_engine.gerar_tabela_completa(arquivo)
+            boletos_pandas = generate_boleto.montar_planilha_prosperar(tabela_pandas)
+            boletos_polars = generate_boleto.montar_planilha_prosperar(polars_engine.gerar_tabela_boletos(arquivo))
+        finally:
+            os.chdir(diretorio_original)
+
+    pd.testing.assert_frame_equal(
+        _comparavel(tabela_pandas), _comparavel(tabela_polars[tabela_pandas.columns]),
+        check_dtype=False, rtol=1e-9,
+    )
+    pd.testing.assert_frame_equal(_comparavel(boletos_pandas), _comparavel(boletos_polars), check_dtype=False, rtol=1e-9)
+
+    # Os casos de borda que têm sócio chegaram à tabela (nos dois motores, pela comparação acima)
+    casos = tabela_pandas[tabela_pandas['Descrição'] == DESCRICAO_CASO_DE_BORDA]
+    assert len(casos) == 7, f'{len(casos)} dos 7 casos de borda com sócio chegaram à tabela'
+    emails = dict(zip(casos['Cliente/Fornecedor'].astype(str), casos['Email']))
+    assert emails['LUCAS PEREIRA LIMA'] == 'lucas@exemplo.com.br', 'dependente recebeu os dados do titular do mesmo documento'
+    assert emails['ANTÔNIO PEREIRA LIMA'] == 'antonio@exemplo.com.br', 'titular recebeu os dados do dependente do mesmo documento'
+    assert 'DESCONHECIDO DA SILVA' not in set(casos['Cliente/Fornecedor'].astype(str)), 'lançamento sem documento nem sócio entrou na tabela'
+
+    resultado = {'linhas': len(tabela_pandas), 'boletos': len(boletos_pandas)}
+    print(f"Motores idênticos: {resultado['linhas']} lançamentos e {resultado['boletos']} boletos, com os casos de borda da junção")
+    return resultado
+
+
+MODULOS_IMPORTACAO = ['cli', 'config', 'generate_client_list', 'generate_boleto', 'send_mail']
+COMANDOS_RAPIDOS = [['cli.py', '--help'], ['cli.py', 'mail', '--help'], ['cli.py', 'config']]
+
+
+def _tempo_processo(argumentos: list[str], repeticoes: int) -> float:
+    # Mediana do tempo de parede de um interpretador novo rodando o comando
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, *argumentos], cwd=diretorio, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def bench_importacao(repeticoes: int = 5) -> dict:
+    # Tempo de importação de cada módulo e de comandos rápidos da CLI, descontando
+    # o tempo de subir um interpretador vazio
+    base = _tempo_processo(['-c', 'pass'], repeticoes)
+    resultado = {'interpretador_ms': base * 1000, 'modulos': {}, 'comandos': {}}
+    print(f"{'interpretador':>28}: {base * 1000:7.1f} ms")
+    for modulo in MODULOS_IMPORTACAO:
+        tempo = _tempo_processo(['-c', f'import {modulo}'], repeticoes) - base
+        resultado['modulos'][modulo] = tempo * 1000
+        print(f'{"import " + modulo:>28}: {tempo * 1000:7.1f} ms')
+    for comando in COMANDOS_RAPIDOS:
+        tempo = _tempo_processo(comando, repeticoes) - base
+        resultado['comandos'][' '.join(comando)] = tempo * 1000
+        print(f'{" ".join(comando):>28}: {tempo * 1000:7.1f} ms')
+    return resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks do envio de boletos e emails.')
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+
+    p = sub.add_parser('render', help='custo por sócio da renderização do email')
+    p.add_argument('--socios', type=int, default=200)
+    p.add_argument('--linhas', type=int, default=4)
+
+    p = sub.add_parser('tamanho', help='bytes por email antes e depois da otimização do HTML')
+    p.add_argument('--socios', type=int, default=200)
+    p.add_argument('--linhas', type=int, default=4)
+
+    p = sub.add_parser('export', help='tempo e memória de cada formato de exportação')
+    p.add_argument('--linhas', type=int, default=50_000)
+    p.add_argument('--formatos', nargs='+', choices=sorted(EXPORTADORES))
+
+    p = sub.add_parser('pipeline', help='tempo e memória de cada etapa sobre dados fictícios')
+    p.add_argument('--linhas', default='100k', help=f'número de lançamentos ou um de {", ".join(synthetic_data.TAMANHOS)}')
+    p.add_argument('--socios', type=int, default=10_000)
+    p.add_argument('--saida', default='benchmark_resultados.jsonl', help='arquivo JSON Lines onde os resultados são acrescentados')
+    p.add_argument('--sem-memoria', action='store_true', help='não mede o pico de memória (mais rápido)')
+
+    p = sub.add_parser('motor', help='filtro, junção e agrupamento no pandas e no Polars, com conferência do resultado')
+    p.add_argument('--linhas', default='1m', help=f'número de lançamentos ou um de {", ".join(synthetic_data.TAMANHOS)}')
+    p.add_argument('--socios', type=int, default=10_000)
+    p.add_argument('--repeticoes', type=int, default=3)
+
+    p = sub.add_parser('paridade', help='conferência rápida do motor Polars contra o pandas, com casos de borda')
+    p.add_argument('--linhas', type=int, default=2_000)
+    p.add_argument('--socios', type=int, default=200)
+    p.add_argument('--seed', type=int, default=7)
+
+    p = sub.add_parser('importacao', help='tempo de importação dos módulos e de comandos rápidos da CLI')
+    p.add_argument('--repeticoes', type=int, default=5)
+
+    args = parser.parse_args()
+    if args.benchmark == 'render':
+        bench_render(args.socios, args.linhas)
+    elif args.benchmark == 'tamanho':
+        bench_tamanho(args.socios, args.linhas)
+    elif args.benchmark == 'export':
+        bench_export(args.linhas, args.formatos)
+    elif args.benchmark == 'pipeline':
+        linhas = synthetic_data.TAMANHOS.get(args.linhas.lower()) or int(args.linhas)
+        bench_pipeline(linhas, args.socios, args.saida, not args.sem_memoria)
+    elif args.benchmark == 'motor':
+        linhas = synthetic_data.TAMANHOS.get(args.linhas.lower()) or int(args.linhas)
+        bench_motor(linhas, args.socios, args.repeticoes)
+    elif args.benchmark == 'paridade':
+        verificar_paridade(args.linhas, args.socios, args.seed)
+    elif args.benchmark == 'importacao':
+        bench_importacao(args.repeticoes)
@@ -0,0 +1,76 @@
+import hashlib
+import os
+from typing import Optional
+
+import pandas as pd
+
+DIRETORIO_CACHE = os.environ.get('BOLETOS_CACHE_DIR', '../cache')
+
+# Tamanho máximo ocupado pelo cache em disco (padrão: 512 MB)
+LIMITE_BYTES = int(os.environ.get('BOLETOS_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Incrementar sempre que a transformação cacheada mudar de comportamento
+VERSAO = 3
+
+
+def cache_desativado() -> bool:
+    return os.environ.get('BOLETOS_SEM_CACHE', '').lower() in ('1', 'true', 'sim')
+
+
+def chave(*caminhos: str, contexto: str = '') -> str:
+    # Hash do conteúdo dos arquivos de entrada (não do nome nem da data)
+    h = hashlib.sha256(f'v{VERSAO}:{contexto}'.encode())
+    for caminho in caminhos:
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(bloco)
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _caminho(chave: str) -> str:
+    return os.path.join(DIRETORIO_CACHE, f'{chave}.parquet')
+
+
+def ler(chave: str) -> Optional[pd.DataFrame]:
+    caminho = _caminho(chave)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        df = pd.read_parquet(caminho)
+    except Exception:
+        # Arquivo corrompido (ex.: execução interrompida): descarta e recalcula
+        os.remove(caminho)
+        return None
+    # Atualiza a data de acesso para a política de remoção (LRU)
+    os.utime(caminho)
+    return df
+
+
+def gravar(chave: str, df: pd.DataFrame) -> None:
+    os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+    caminho = _caminho(chave)
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+    limpar(LIMITE_BYTES)
+
+
+def limpar(limite_bytes: int = 0) -> None:
+    # Remove as entradas usadas há mais tempo até caber no limite
+    if not os.path.isdir(DIRETORIO_CACHE):
+        return
+    entradas = []
+    for nome in os.listdir(DIRETORIO_CACHE):
+        # .csv: cópias em UTF-8 do backup usadas pelo motor Polars
+        if nome.endswith(('.parquet', '.csv')):
+            caminho = os.path.join(DIRETORIO_CACHE, nome)
+            stat = os.stat(caminho)
+            entradas.append((stat.st_mtime, stat.st_size, caminho))
+
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    for _, tamanho, caminho in sorted(entradas):
+        if total <= limite_bytes:
+            break
+        os.remove(caminho)
+        total -= tamanho
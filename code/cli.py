@@ -0,0 +1,123 @@
+import argparse
+import importlib
+import sys
+from typing import List, Optional
+
+# Nada pesado é importado aqui: pandas, smtplib, premailer e dotenv só são
+# carregados pelo módulo do subcomando escolhido
+ARQUIVO_LANCAMENTOS = 'backup_granatum_20231129.csv'
+ARQUIVO_SOCIOS = 'backup_cliente_20231129.csv'
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cli.py', description='Boletos e emails de mensalidade do CEBUDV NSJB.')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p = sub.add_parser('members', help='atualiza a lista de sócios a partir da exportação do Granatum')
+    p.add_argument('--arquivo', default=ARQUIVO_SOCIOS, help='exportação de clientes em ../socios')
+    p.add_argument('--upsert', action='store_true', help='mescla a exportação na lista existente em vez de recriá-la')
+    p.set_defaults(modulo='generate_client_list')
+
+    p = sub.add_parser('boletos', help='gera a planilha de boletos para o ProsperarBank')
+    p.add_argument('--arquivo', default=ARQUIVO_LANCAMENTOS, help='backup de lançamentos em ../update')
+    p.add_argument('--formato', default='xlsx', help='formato do arquivo de boletos: xlsx, openpyxl, csv ou parquet')
+    p.add_argument('--metricas', metavar='ARQUIVO', help='grava um relatório JSON com tempos, linhas e memória de cada etapa')
+    p.add_argument('--incremental', action='store_true', help='emite boletos só dos lançamentos novos ou alterados desde o último backup')
+    p.add_argument('--motor', choices=['pandas', 'polars'], default='pandas', help='motor do filtro, junção e agrupamento (polars é opcional)')
+    p.set_defaults(modulo='generate_boleto')
+
+    p = sub.add_parser('mail', help='envia o descritivo de mensalidade para os sócios')
+    p.add_argument('--arquivo', default=ARQUIVO_LANCAMENTOS, help='backup de lançamentos em ../update')
+    p.add_argument('--simular', action='store_true', help='só conta os sócios e o valor total, sem renderizar nem enviar')
+    p.add_argument('--async', dest='modo_async', action='store_true', help='envia com várias sessões SMTP simultâneas')
+    p.add_argument('--sessoes', type=int, default=4, help='número de sessões SMTP simultâneas (modo async)')
+    p.add_argument('--por-segundo', type=float, help='limite de mensagens por segundo (padrão: SMTP_RATE_SECOND ou 5)')
+    p.add_argument('--por-hora', type=float, help='limite de mensagens por hora (padrão: SMTP_RATE_HOUR)')
+    p.add_argument('--processos', type=int, help='renderiza os emails em N processos, enviando enquanto renderiza')
+    p.add_argument('--outbox', action='store_true', help='usa a caixa de saída persistente: retoma um envio interrompido sem reenviar')
+    p.add_argument('--sem-cache', action='store_true', help='ignora o cache de lançamentos já processados')
+    p.add_argument('--metricas', metavar='ARQUIVO', help='grava um relatório JSON com tempos, memória e latência SMTP')
+    p.add_argument('--incremental', action='store_true', help='envia só os lançamentos novos ou alterados desde o último backup')
+    p.add_argument('--pular-pagos', action='store_true', help='não envia o lembrete a quem já pagou, segundo a última conciliação')
+    p.set_defaults(modulo='send_mail')
+
+    p = sub.add_parser('pipeline', help='roda sócios, boletos e emails em ordem, pulando etapas sem alteração')
+    p.add_argument('--arquivo', default=ARQUIVO_LANCAMENTOS, help='backup de lançamentos em ../update')
+    p.add_argument('--arquivo-socios', default=ARQUIVO_SOCIOS, help='exportação de clientes em ../socios')
+    p.add_argument('--formato', default='xlsx', help='formato do arquivo de boletos: xlsx, openpyxl, csv ou parquet')
+    p.add_argument('--processos', type=int, help='renderiza os emails em N processos')
+    p.add_argument('--enviar', action='store_true', help='envia os emails enfileirados na caixa de saída')
+    p.add_argument('--forcar', action='store_true', help='roda todas as etapas mesmo sem alteração nas entradas')
+    p.add_argument('--sequencial', action='store_true', help='uma etapa por vez, sem paralelismo')
+    p.add_argument('--pular-pagos', action='store_true', help='não envia o lembrete a quem já pagou, segundo a última conciliação')
+    p.add_argument('--metricas', metavar='ARQUIVO', help='grava um relatório JSON com tempos e memória de cada etapa')
+    p.set_defaults(modulo='pipeline')
+
+    p = sub.add_parser('vigiar', help='fica aguardando exportações novas em ../update e ../socios e processa cada uma')
+    p.add_argument('--formato', default='xlsx', help='formato do arquivo de boletos: xlsx, openpyxl, csv ou parquet')
+    p.add_argument('--processos', type=int, help='renderiza os emails em N processos')
+    p.add_argument('--trabalhadores', type=int, default=2, help='backups processados ao mesmo tempo')
+    p.add_argument('--intervalo', type=float, default=5.0, help='segundos entre verificações das pastas')
+    p.add_argument('--estabilidade', type=float, default=2.0, help='segundos sem alteração para considerar o arquivo completo')
+    p.add_argument('--enviar', action='store_true', help='envia os emails enfileirados na caixa de saída')
+    p.add_argument('--pular-pagos', action='store_true', help='não envia o lembrete a quem já pagou, segundo a última conciliação')
+    p.add_argument('--existentes', action='store_true', help='processa também as exportações que já estão nas pastas')
+    p.set_defaults(modulo='watcher')
+
+    p = sub.add_parser('historico', help='junta vários backups num histórico Parquet e soma as contribuições do ano por sócio')
+    p.add_argument('--arquivos', nargs='+', help='backups em ../update (padrão: todos os backup_granatum_*.csv)')
+    p.add_argument('--processos', type=int, help='backups lidos em paralelo (padrão: número de CPUs)')
+    p.add_argument('--ano', type=int, help='só os totais deste ano de vencimento')
+    p.add_argument('--formato', default='xlsx', help='formato do arquivo de totais: xlsx, openpyxl, csv ou parquet')
+    p.add_argument('--sem-carga', action='store_true', help='só recalcula os totais a partir do histórico já gravado')
+    p.add_argument('--metricas', metavar='ARQUIVO', help='grava um relatório JSON com tempos e memória de cada etapa')
+    p.set_defaults(modulo='history')
+
+    p = sub.add_parser('conciliar', help='concilia os boletos emitidos com os arquivos de retorno do ProsperarBank')
+    p.add_argument('--retornos', nargs='+', help='arquivos de retorno em ../retornos (padrão: todos os .csv e .xlsx)')
+    p.add_argument('--formato', default='xlsx', help='formato dos relatórios: xlsx, openpyxl, csv ou parquet')
+    p.add_argument('--metricas', metavar='ARQUIVO', help='grava um relatório JSON com tempos e memória de cada etapa')
+    p.set_defaults(modulo='reconciliation')
+
+    p = sub.add_parser('config', help='mostra e verifica a configuração SMTP (.env)')
+    p.set_defaults(modulo='config')
+
+    p = sub.add_parser('smtp-local', help='servidor SMTP de teste que aceita as mensagens sem entregar')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--porta', type=int, default=8025)
+    p.add_argument('--usuario', help='exige AUTH com este usuário')
+    p.add_argument('--senha')
+    adicionar_opcoes_sumidouro(p)
+    p.set_defaults(modulo='smtp_sink')
+
+    p = sub.add_parser('carga', help='teste de carga do envio contra um servidor SMTP local')
+    p.add_argument('--mensagens', type=int, default=2000, help='quantidade de emails fictícios')
+    p.add_argument('--modo', choices=['lote', 'async', 'outbox'], default='lote', help='caminho de envio do subcomando mail')
+    p.add_argument('--sessoes', type=int, default=4, help='sessões SMTP simultâneas (modo async)')
+    p.add_argument('--por-segundo', type=float, default=1000.0, help='limite de mensagens por segundo (modo async)')
+    p.add_argument('--processos', type=int, help='renderiza os emails em N processos')
+    p.add_argument('--metricas', metavar='ARQUIVO', help='grava um relatório JSON com tempos, memória e latência SMTP')
+    adicionar_opcoes_sumidouro(p)
+    p.set_defaults(modulo='load_test')
+
+    return parser
+
+
+def adicionar_opcoes_sumidouro(p: argparse.ArgumentParser) -> None:
+    p.add_argument('--certificado', help='certificado PEM para oferecer STARTTLS')
+    p.add_argument('--chave', help='chave privada do certificado')
+    p.add_argument('--latencia', type=float, default=0.0, help='segundos de espera antes de responder a cada mensagem')
+    p.add_argument('--variacao', type=float, default=0.0, help='espera aleatória adicional, de 0 a N segundos')
+    p.add_argument('--falha-4xx', type=float, default=0.0, help='fração das mensagens recusadas com 451 (temporária)')
+    p.add_argument('--falha-5xx', type=float, default=0.0, help='fração das mensagens recusadas com 550 (permanente)')
+    p.add_argument('--queda', type=float, default=0.0, help='fração das mensagens em que a conexão cai sem resposta')
+    p.add_argument('--seed', type=int, help='semente das falhas e da latência aleatórias')
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = criar_parser().parse_args(argv)
+    importlib.import_module(args.modulo).executar(args)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,55 @@
+import functools
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+# Variáveis obrigatórias para o envio dos emails
+VARIAVEIS_SMTP = ['SENDER_EMAIL', 'SENDER_PASS', 'SMTP_SERVER', 'SMTP_PORT']
+
+
+@dataclass(frozen=True)
+class Configuracao:
+    remetente: Optional[str]
+    senha: Optional[str]
+    servidor: Optional[str]
+    porta: Optional[str]
+    por_segundo: float
+    por_hora: Optional[float]
+    # Aceita servidor sem STARTTLS, mas só em localhost (servidor de teste)
+    sem_tls_local: bool = False
+
+    @property
+    def faltando(self) -> List[str]:
+        valores = [self.remetente, self.senha, self.servidor, self.porta]
+        return [nome for nome, valor in zip(VARIAVEIS_SMTP, valores) if not valor]
+
+
+@functools.lru_cache(maxsize=None)
+def carregar() -> Configuracao:
+    # O .env só é lido na primeira vez que alguém precisa da configuração
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    por_hora = os.environ.get('SMTP_RATE_HOUR')
+    return Configuracao(
+        remetente=os.environ.get('SENDER_EMAIL'),
+        senha=os.environ.get('SENDER_PASS'),
+        servidor=os.environ.get('SMTP_SERVER'),
+        porta=os.environ.get('SMTP_PORT'),
+        por_segundo=float(os.environ.get('SMTP_RATE_SECOND', 5)),
+        por_hora=float(por_hora) if por_hora else None,
+        sem_tls_local=os.environ.get('SMTP_PLAIN_LOCAL', '').lower() in ('1', 'true', 'sim'),
+    )
+
+
+def executar(args) -> None:
+    # Verificação rápida da configuração, sem carregar pandas nem abrir conexão
+    configuracao = carregar()
+    print(f'Servidor SMTP: {configuracao.servidor}:{configuracao.porta}')
+    print(f'Remetente: {configuracao.remetente}')
+    print(f'Senha: {"definida" if configuracao.senha else "não definida"}')
+    print(f'Limite: {configuracao.por_segundo} msg/s, {configuracao.por_hora or "sem limite de"} msg/h')
+    if configuracao.sem_tls_local:
+        print('STARTTLS dispensado para servidor local (SMTP_PLAIN_LOCAL)')
+    if configuracao.faltando:
+        raise SystemExit(f'Variáveis não definidas: {", ".join(configuracao.faltando)}')
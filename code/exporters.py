@@ -0,0 +1,105 @@
+import os
+from typing import Callable, Dict
+
+import pandas as pd
+
+# Layout da planilha de importação de boletos do ProsperarBank
+COLUNAS_PROSPERAR = [
+    'ID Externo*',
+    'Nome Completo do Pagador (Sacado)*',
+    'E-mail*',
+    'CPF/CNPJ*',
+    'Rua*',
+    'Número*',
+    'Bairro*',
+    'Cidade*',
+    'Estado*',
+    'Cep*',
+    'Vencimento*',
+    'Valor (R$)*',
+    'Tipo de Multa',
+    'Valor Multa (R$/%)',
+    'Tipo Juros Mora',
+    'Valor Juros Mora',
+    'Tipo de Desconto',
+    'Data limite desconto 1',
+    'Valor desconto 1 (R$/%)',
+    'Data limite desconto 2',
+    'Valor desconto 2 (R$/%)',
+    'Data limite desconto 3',
+    'Valor desconto 3 (R$/%)',
+]
+
+
+def exportar_xlsx(df: pd.DataFrame, caminho: str) -> None:
+    # Escrita em streaming: cada linha vai para o disco assim que é escrita,
+    # sem montar a planilha inteira em memória
+    import xlsxwriter
+
+    with xlsxwriter.Workbook(caminho, {'constant_memory': True}) as workbook:
+        planilha = workbook.add_worksheet('boletos')
+        planilha.write_row(0, 0, list(df.columns))
+
+        # Colunas opcionais totalmente vazias (multa, juros, descontos) não são percorridas
+        preenchidas = [i for i, coluna in enumerate(df.columns) if df[coluna].notna().any()]
+        numericas = [pd.api.types.is_numeric_dtype(df.iloc[:, i]) for i in preenchidas]
+        linhas = df.iloc[:, preenchidas].itertuples(index=False, name=None)
+        for linha, valores in enumerate(linhas, start=1):
+            for coluna, numerica, valor in zip(preenchidas, numericas, valores):
+                if valor is None or valor != valor:
+                    continue
+                if numerica:
+                    planilha.write_number(linha, coluna, valor)
+                else:
+                    # Sempre texto: nomes e endereços vêm do Granatum, e um
+                    # '=...' viraria fórmula na planilha enviada ao banco
+                    planilha.write_string(linha, coluna, str(valor))
+
+
+def exportar_openpyxl(df: pd.DataFrame, caminho: str) -> None:
+    # Escritor padrão do pandas (monta a planilha toda em memória)
+    with pd.ExcelWriter(caminho, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='boletos', index=False)
+        # O openpyxl grava como fórmula todo texto que começa com '='; o
+        # DataFrame não tem fórmulas, então essas células voltam a ser texto
+        for linha in writer.sheets['boletos'].iter_rows(min_row=2):
+            for celula in linha:
+                if celula.data_type == 'f':
+                    celula.data_type = 's'
+
+
+def exportar_csv(df: pd.DataFrame, caminho: str) -> None:
+    df.to_csv(caminho, sep=';', index=False, encoding='utf-8-sig')
+
+
+def exportar_parquet(df: pd.DataFrame, caminho: str) -> None:
+    df.to_parquet(caminho, index=False)
+
+
+EXPORTADORES: Dict[str, Callable[[pd.DataFrame, str], None]] = {
+    'xlsx': exportar_xlsx,
+    'openpyxl': exportar_openpyxl,
+    'csv': exportar_csv,
+    'parquet': exportar_parquet,
+}
+
+EXTENSOES = {
+    'xlsx': 'xlsx',
+    'openpyxl': 'xlsx',
+    'csv': 'csv',
+    'parquet': 'parquet',
+}
+
+
+def exportar(df: pd.DataFrame, caminho_base: str, formato: str = 'xlsx') -> str:
+    # Grava a planilha no formato pedido e devolve o caminho do arquivo
+    if formato not in EXPORTADORES:
+        raise ValueError(f'Formato de exportação desconhecido: {formato} (opções: {", ".join(EXPORTADORES)})')
+
+    caminho = f'{caminho_base}.{EXTENSOES[formato]}'
+    EXPORTADORES[formato](df, caminho)
+    return caminho
+
+
+def tamanho(caminho: str) -> int:
+    return os.path.getsize(caminho)
@@ -1,55 +1,78 @@
+import sys
+
+# Executado direto: o cli.py interpreta os argumentos e só então importa este
+# módulo, sem carregar o pandas duas vezes (nem para o --help)
+if __name__ == '__main__':
+    import cli
+    cli.main(['boletos', *sys.argv[1:]])
+    sys.exit()
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
 import pandas as pd
 import numpy as np
 
-def gerar_tabela_completa(filename: str = 'backup_granatum.csv') -> pd.DataFrame:
-    # Lendo CSV de Lançamentos do Granatum
-    df = pd.read_csv(f'../update/{filename}', encoding='latin-1', sep=';')
-
-    # Selecionando somente o tipo de pagamento e excluindo o cliente Granatum
-    df = df[((df['Forma de pagamento'] == 'Boleto - Granatum Pagamentos') | (df['Forma de pagamento'] == 'Boleto ProsperarBank')) & (df['Cliente/Fornecedor'] != 'GRANATUM LTDA - EPP')]
-
-    # Alterando o valor do boletos para R$ 4,50
-    df.loc[df['Categoria'] == '005 - Tx Boleto', 'Valor'] = '4,50'
-
-    # Selecionando as colunas necessárias
-    df = df[['Cliente/Fornecedor', 'Data de vencimento', 'Descrição', 'Valor', 'Documento cliente/fornecedor']]
-
-    # Colocando todos os Vencimentos no dia 10
-    df['Data de vencimento'] = '10' + df['Data de vencimento'].str[2:]
-
-    # Lendo Lista de Sócios
-    df_socios = pd.read_parquet(f'../socios/lista_de_socios.parquet')
-
-    # Unindo as informações das Tabelas de Lançamentos e de Sócios
-    df_complete = pd.merge(
-        df,
-        df_socios,
-        how="inner",
-        left_on="Cliente/Fornecedor",
-        right_on="Nome/Razão Social",
-        suffixes=("_x", "_y"),
-        copy=True,
-        indicator=False,
-        validate=None,
-    )
-    
-    return df_complete
+import incremental
+import metrics
+import reconciliation
+from exporters import COLUNAS_PROSPERAR, EXPORTADORES, exportar, tamanho
+from ledger import gerar_tabela_completa
+from validation import normalizar_cep, relatorio_rejeitados, validar_boletos
 
-def gerar_arquivo_prosperar(df: pd.DataFrame) -> None:
-    # Gera Data de Referência
-    data_vencimento = df['Data de vencimento'].unique()[0][-4:] + df['Data de vencimento'].unique()[0][3:5] + df['Data de vencimento'].unique()[0][:2]
-    
-    # Transforma a coluna de Valor em Float
-    df['Valor'] = df['Valor'].str.replace(',','.').astype(float)
-    
+# Chaves da soma por sócio; lançamentos com alguma delas vazia não entram na planilha
+COLUNAS_AGRUPAMENTO = ['Cliente/Fornecedor', 'Email', 'Documento cliente/fornecedor', 'Endereço', 'Número', 'Bairro', 'Cidade', 'Estado', 'CEP', 'Data de vencimento']
+
+@metrics.etapa('gerar_arquivo_prosperar')
+def gerar_arquivo_prosperar(
+    df: pd.DataFrame, sufixo: str = '', processos: Optional[int] = None, formato: str = 'xlsx',
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Devolve o resumo das planilhas gravadas e os lançamentos que entraram nelas
+    # Sócios com CPF/CNPJ, CEP ou email inválido ficam fora da planilha e vão para o relatório
+    df, rejeitados = validar_boletos(df)
+    if len(rejeitados):
+        relatorio = relatorio_rejeitados(rejeitados)
+        caminho_rejeitados = f'../boletos/boletos_rejeitados{sufixo}.csv'
+        relatorio.to_csv(caminho_rejeitados, sep=';', index=False, encoding='utf-8-sig')
+        metrics.registrar('rejeitados', caminho=caminho_rejeitados, socios=len(relatorio), linhas=len(rejeitados))
+        print(f'{len(relatorio)} sócios rejeitados na validação ({len(rejeitados)} lançamentos): {caminho_rejeitados}')
+
+    # Separa os lançamentos por mês de vencimento: uma planilha por mês
+    mes_vencimento = df['Data de vencimento'].str[-4:] + df['Data de vencimento'].str[3:5]
+    tarefas = []
+    for _, df_mes in df.groupby(mes_vencimento, sort=True):
+        # Gera Data de Referência
+        vencimento = df_mes['Data de vencimento'].iloc[0]
+        data_vencimento = vencimento[-4:] + vencimento[3:5] + vencimento[:2]
+        tarefas.append((df_mes, f"../boletos/{data_vencimento}_boletos_prosperar{sufixo}", formato))
+
+    # Monta e grava as planilhas em paralelo
+    if len(tarefas) > 1 and processos != 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resumo = list(executor.map(_gerar_planilha, *zip(*tarefas)))
+    else:
+        resumo = [_gerar_planilha(*tarefa) for tarefa in tarefas]
+
+    resumo = pd.DataFrame(resumo, columns=['Arquivo', 'Boletos', 'Valor Total', 'Bytes'])
+    for arquivo, boletos, _, tamanho_arquivo in resumo.itertuples(index=False):
+        metrics.registrar('arquivo', caminho=arquivo, linhas=boletos, bytes=tamanho_arquivo)
+    print(resumo.to_string(index=False) if len(resumo) else 'Nenhum boleto a emitir.')
+
+    # Fora da planilha: chaves vazias na soma por sócio e o boleto da C. Beatriz
+    na_planilha = df[COLUNAS_AGRUPAMENTO].notna().all(axis=1) & (df['Cliente/Fornecedor'] != 'BEATRIZ DA ROSA')
+    return resumo, df[na_planilha.to_numpy()]
+
+def montar_planilha_prosperar(df: pd.DataFrame, inicio: int = 1) -> pd.DataFrame:
     # Agrupa os Lançamentos por Sócio
-    df = df.groupby(['Cliente/Fornecedor', 'Email', 'Documento cliente/fornecedor', 'Endereço', 'Número', 'Bairro', 'Cidade','Estado', 'CEP', 'Data de vencimento'], as_index=False)['Valor'].sum()
+    df = df.groupby(COLUNAS_AGRUPAMENTO, as_index=False, observed=True)['Valor'].sum()
     
-    # Remove o '.0' dos CEPs
-    df['CEP'] = df['CEP'].astype(str).str.replace('.0', '')
+    # CEP só com dígitos e zeros à esquerda (sem o '.0' de quando vem como número)
+    df['CEP'] = normalizar_cep(df['CEP']).fillna('').astype(object)
     
-    # Adiciona coluna de ID Externo
-    df['id_aux'] = range(1, 1 + df.shape[0])
+    # Adiciona coluna de ID Externo (sequência a partir de ``inicio`` no mês)
+    df['id_aux'] = range(inicio, inicio + df.shape[0])
     df['id_aux'] = df['id_aux'].map(lambda x: f'{x:0>3}')
     df['ID Externo'] = df['Data de vencimento'].str[-4:] + df['Data de vencimento'].str[3:5] + df['id_aux'].astype(str).str[:]
     df = df.drop(columns=['id_aux'])
@@ -87,38 +110,84 @@ def gerar_arquivo_prosperar(df: pd.DataFrame) -> None:
         df[name] = np.nan
         
     # Ordena as colunas
-    df = df[
-        ['ID Externo*',
-        'Nome Completo do Pagador (Sacado)*',
-        'E-mail*',
-        'CPF/CNPJ*',
-        'Rua*',
-        'Número*',
-        'Bairro*',
-        'Cidade*',
-        'Estado*',
-        'Cep*',
-        'Vencimento*',
-        'Valor (R$)*',
-        'Tipo de Multa',
-        'Valor Multa (R$/%)',
-        'Tipo Juros Mora',
-        'Valor Juros Mora',
-        'Tipo de Desconto',
-        'Data limite desconto 1',
-        'Valor desconto 1 (R$/%)',
-        'Data limite desconto 2',
-        'Valor desconto 2 (R$/%)',
-        'Data limite desconto 3',
-        'Valor desconto 3 (R$/%)',]
-    ]
+    df = df[COLUNAS_PROSPERAR]
     
     # Remove o boleto da C. Beatriz
     df = df[df['Nome Completo do Pagador (Sacado)*'] != 'BEATRIZ DA ROSA']
         
-    # Exporta no formato Excel
-    df.to_excel(f"../boletos/{data_vencimento}_boletos_prosperar.xlsx", sheet_name='boletos', index=False) 
+    return df
+
+def relatorio_alterados(df: pd.DataFrame) -> pd.DataFrame:
+    # Lançamentos com valor alterado e os IDs Externos dos boletos já emitidos
+    # para o sócio naquele vencimento, que precisam ser cancelados no banco
+    relatorio = pd.DataFrame({
+        'Sócio': df['Cliente/Fornecedor'].astype(str).to_numpy(),
+        'CPF/CNPJ': df['Documento cliente/fornecedor'].astype(str).to_numpy(),
+        'Vencimento': df['Data de vencimento'].to_numpy(),
+        'Descrição': df['Descrição'].to_numpy(),
+        'Valor anterior': df['valor_anterior'].to_numpy(),
+        'Valor novo': df['Valor'].to_numpy(),
+    })
+    emitidos = reconciliation.ler_emitidos()
+    emitidos['chave'] = emitidos['nome'] + '|' + emitidos['vencimento']
+    ids = emitidos.groupby('chave')['id'].agg(', '.join)
+    relatorio['IDs Externos emitidos'] = (relatorio['Sócio'] + '|' + relatorio['Vencimento']).map(ids).fillna('')
+    return relatorio
+
+def _gerar_planilha(df: pd.DataFrame, caminho_base: str, formato: str) -> tuple:
+    # Continua a numeração dos IDs já enviados ao banco neste mês; ao refazer
+    # a planilha, os boletos que já estavam nela mantêm o ID
+    arquivo_base = os.path.basename(caminho_base)
+    df = montar_planilha_prosperar(df, inicio=1 + reconciliation.ultima_sequencia(arquivo_base[:6]))
+    df = reconciliation.reaproveitar_ids(df, arquivo_base)
+
+    # Exporta no formato pedido (xlsx em streaming por padrão)
+    arquivo = exportar(df, caminho_base, formato)
+
+    # Guarda os IDs Externos emitidos para a conciliação com os pagamentos
+    reconciliation.registrar_emissao(df, arquivo)
+
+    return arquivo, len(df), round(df['Valor (R$)*'].sum(), 2), tamanho(arquivo)
     
-if __name__ == '__main__':
-    df = gerar_tabela_completa('backup_granatum_20231129.csv')
-    gerar_arquivo_prosperar(df)
\ No newline at end of file
+def _sufixo_livre(sufixo: str) -> str:
+    # Rodar o incremental de novo sobre o mesmo backup (ex.: depois de corrigir
+    # sócios rejeitados) não pode sobrescrever a planilha já enviada ao banco
+    livre, n = sufixo, 1
+    while glob.glob(f'../boletos/*_boletos_prosperar{livre}.*'):
+        n += 1
+        livre = f'{sufixo}_{n}'
+    return livre
+
+def executar(args) -> None:
+    # Chamado pelo cli.py (subcomando boletos); os argumentos são definidos lá
+    if args.formato not in EXPORTADORES:
+        raise SystemExit(f'Formato de exportação desconhecido: {args.formato} (opções: {", ".join(EXPORTADORES)})')
+    if args.metricas:
+        metrics.ativar(args.metricas)
+
+    filename = args.arquivo
+    if args.incremental:
+        delta = incremental.calcular_delta(filename, etapa='boletos')
+        sufixo = _sufixo_livre(f'_delta_{filename[-12:-4]}')
+        # Só lançamentos novos viram boleto: o boleto original de um alterado
+        # continua em aberto no banco, então ele vai para o relatório e é
+        # cancelado/refeito manualmente, sem cobrar o sócio duas vezes
+        alterado = (delta.df['situacao'] == 'alterado').to_numpy()
+        processados = [delta.df.loc[alterado, 'chave'].to_numpy()]
+        if (~alterado).any():
+            _, emitidos = gerar_arquivo_prosperar(delta.df[~alterado], sufixo=sufixo, formato=args.formato)
+            processados.append(emitidos['chave'].to_numpy())
+        if alterado.any():
+            caminho = f'../boletos/boletos_alterados{sufixo}.csv'
+            relatorio_alterados(delta.df[alterado]).to_csv(caminho, sep=';', index=False, encoding='utf-8-sig')
+            print(f'{int(alterado.sum())} lançamentos alterados em boletos já emitidos, sem boleto novo: {caminho}')
+        # Rejeitados na validação, sem sócio ou fora da planilha voltam no próximo delta
+        delta.registrar(chaves=np.concatenate(processados))
+    elif args.motor == 'polars':
+        # Filtro, junção e soma por sócio feitos pelo Polars; a planilha sai igual
+        import polars_engine
+        df = polars_engine.gerar_tabela_boletos(filename)
+        gerar_arquivo_prosperar(df, formato=args.formato)
+    else:
+        df = gerar_tabela_completa(filename)
+        gerar_arquivo_prosperar(df, formato=args.formato)
@@ -1,14 +1,172 @@
+import os
+from typing import List, Optional
+
+import numpy as np
 import pandas as pd
 
-def generate_client_list(filename: str = 'backup_cliente.csv') -> None:
-    # Lendo CSV de Sócios do Granatum
-    df = pd.read_csv(f'../socios/{filename}', encoding='latin-1', sep=';')
+CAMINHO_SOCIOS = '../socios/lista_de_socios.parquet'
+CAMINHO_INDICE = '../socios/indice_socios.parquet'
+CAMINHO_HISTORICO = '../socios/historico_socios.parquet'
+
+COLUNAS_SOCIOS = ['Nome/Razão Social', 'CPF/CNPJ', 'Email', 'Endereço', 'Número', 'Complemento', 'Bairro', 'Cidade', 'Estado', 'CEP', 'Ativo']
+
+# Colunas da lista de sócios usadas na junção com os lançamentos
+COLUNAS_JUNCAO = ['Nome/Razão Social', 'CPF/CNPJ', 'Email', 'Endereço', 'Número', 'Bairro', 'Cidade', 'Estado', 'CEP']
+
+VALORES_ATIVO = ['sim', 's', 'true', '1', 'ativo', 'yes']
+
+
+def chave_documento(serie: pd.Series) -> pd.Series:
+    # Documento normalizado como inteiro: só os dígitos, com o tipo (1 = CPF,
+    # 2 = CNPJ) no último algarismo para CPF e CNPJ nunca colidirem
+    if pd.api.types.is_numeric_dtype(serie):
+        serie = serie.astype('Int64')
+    digitos = serie.astype('string').str.replace(r'\D', '', regex=True)
+    digitos = digitos.mask(digitos == '')
+    tipo = (digitos.str.len() > 11).map({False: 1, True: 2}).astype('Int64')
+    return digitos.astype('Int64') * 10 + tipo
+
+
+def normalizar_nome(serie: pd.Series) -> pd.Series:
+    # Sem acentos, maiúsculo e com espaços simples
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = normalizar_nome(pd.Series(serie.cat.categories)).to_numpy()
+        codigos = serie.cat.codes.to_numpy()
+        return pd.Series(categorias[codigos], index=serie.index).where(codigos >= 0)
+    return (
+        serie.astype('string')
+        .str.normalize('NFKD')
+        .str.encode('ascii', errors='ignore')
+        .str.decode('ascii')
+        .str.upper()
+        .str.split()
+        .str.join(' ')
+    )
+
+
+def gerar_indice_socios(df: pd.DataFrame) -> pd.DataFrame:
+    # Índice da lista de sócios: posição de cada sócio por documento e por nome
+    indice = pd.DataFrame({
+        'documento': chave_documento(df['CPF/CNPJ']).to_numpy(),
+        'nome': normalizar_nome(df['Nome/Razão Social']).to_numpy(),
+        'posicao': range(len(df)),
+    })
+    indice.to_parquet(CAMINHO_INDICE, index=False)
+    return indice
+
+
+def ler_export_socios(filename: str) -> pd.DataFrame:
+    # Lendo CSV de Sócios do Granatum (documento e CEP como texto, sem perder zeros à esquerda)
+    df = pd.read_csv(f'../socios/{filename}', encoding='latin-1', sep=';', dtype={'CPF/CNPJ': str, 'CEP': str})
 
     # Seleciona as colunas necessárias
-    df = df[['Nome/Razão Social', 'CPF/CNPJ', 'Email', 'Endereço', 'Número', 'Complemento', 'Bairro', 'Cidade', 'Estado', 'CEP', 'Ativo']]
+    df = df[COLUNAS_SOCIOS].copy()
+
+    # Ativo como booleano, para os leitores poderem filtrar direto no Parquet
+    df['Ativo'] = df['Ativo'].astype('string').str.strip().str.lower().isin(VALORES_ATIVO)
+
+    return df
+
+
+def salvar_lista_socios(df: pd.DataFrame) -> None:
+    # Ordena pela chave do documento e grava com dicionário e estatísticas por
+    # coluna, para leituras de poucas colunas ou só dos sócios ativos
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    chaves = chave_documento(df['CPF/CNPJ']).fillna(np.iinfo(np.int64).max).to_numpy(np.int64)
+    df = df.iloc[np.argsort(chaves, kind='stable')].reset_index(drop=True)
+
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    temporario = f'{CAMINHO_SOCIOS}.tmp'
+    pq.write_table(tabela, temporario, use_dictionary=True, write_statistics=True, row_group_size=10_000)
+    os.replace(temporario, CAMINHO_SOCIOS)
+
+    # O índice guarda posições na lista, então é refeito a cada gravação
+    gerar_indice_socios(df)
+
+
+def ler_socios(colunas: Optional[List[str]] = None, somente_ativos: bool = False) -> pd.DataFrame:
+    filtros = [('Ativo', '==', True)] if somente_ativos else None
+    return pd.read_parquet(CAMINHO_SOCIOS, columns=colunas, filters=filtros)
+
+
+def _chave_upsert(df: pd.DataFrame) -> pd.Series:
+    # Documento quando houver; senão, o nome normalizado
+    documento = chave_documento(df['CPF/CNPJ'])
+    return ('D' + documento.astype('string')).fillna('N' + normalizar_nome(df['Nome/Razão Social']))
+
+
+def _chaves_unicas(df: pd.DataFrame, colisoes: pd.Index, rotulo: str) -> pd.Index:
+    # Documentos compartilhados (ex.: dependentes cobrados no CPF do titular)
+    # ganham o nome na chave; o que ainda repetir (mesmo documento e nome) é
+    # numerado pela ordem, sem descartar nenhum sócio
+    chave = _chave_upsert(df)
+    compartilhado = chave.isin(colisoes)
+    chave = chave.where(~compartilhado, chave + '|' + normalizar_nome(df['Nome/Razão Social']).fillna(''))
+    ocorrencia = chave.groupby(chave.to_numpy()).cumcount()
+    repetidas = ocorrencia > 0
+    if repetidas.any():
+        exemplos = ', '.join(map(str, df.loc[repetidas.to_numpy(), 'Nome/Razão Social'].unique()[:10]))
+        print(f'{rotulo}: {int(repetidas.sum())} sócios repetidos (mesmo documento e nome), mantidos: {exemplos}')
+        chave = chave.where(~repetidas, chave + '#' + ocorrencia.astype(str))
+    if compartilhado.any():
+        print(f'{rotulo}: {int(compartilhado.sum())} sócios com CPF/CNPJ compartilhado, identificados também pelo nome')
+    return pd.Index(chave.to_numpy())
+
+
+def atualizar_lista_socios(filename: str) -> dict:
+    # Upsert: mescla a exportação nova na lista existente pelo CPF/CNPJ,
+    # mantendo sócios que não vieram na exportação e registrando o histórico
+    novo = ler_export_socios(filename)
+    atual = pd.read_parquet(CAMINHO_SOCIOS) if os.path.exists(CAMINHO_SOCIOS) else novo.iloc[:0]
+
+    # Um documento repetido em qualquer das duas listas é chaveado por
+    # documento e nome nas duas, para os sócios continuarem se correspondendo
+    chaves_novo, chaves_atual = _chave_upsert(novo), _chave_upsert(atual)
+    colisoes = pd.Index(chaves_novo[chaves_novo.duplicated()]).union(pd.Index(chaves_atual[chaves_atual.duplicated()]))
+    novo.index = _chaves_unicas(novo, colisoes, filename)
+    atual.index = _chaves_unicas(atual, colisoes, 'lista atual')
+
+    comuns = novo.index.intersection(atual.index)
+    assinatura_atual = pd.util.hash_pandas_object(atual.loc[comuns, COLUNAS_SOCIOS].astype('string'), index=False)
+    assinatura_nova = pd.util.hash_pandas_object(novo.loc[comuns, COLUNAS_SOCIOS].astype('string'), index=False)
+    alterados = comuns[assinatura_atual.to_numpy() != assinatura_nova.to_numpy()]
+    inseridos = novo.index.difference(atual.index)
+
+    if len(alterados) or len(inseridos):
+        df = pd.concat([atual.drop(index=alterados), novo.loc[alterados], novo.loc[inseridos]])
+        salvar_lista_socios(df.reset_index(drop=True))
+
+        historico = pd.concat([
+            atual.loc[alterados].assign(operacao='alterado'),
+            novo.loc[inseridos].assign(operacao='inserido'),
+        ]).rename_axis('chave').reset_index()
+        historico['arquivo'] = filename
+        historico['registrado_em'] = pd.Timestamp.now()
+        if os.path.exists(CAMINHO_HISTORICO):
+            historico = pd.concat([pd.read_parquet(CAMINHO_HISTORICO), historico], ignore_index=True)
+        historico.to_parquet(CAMINHO_HISTORICO, index=False)
+
+    resumo = {'inseridos': len(inseridos), 'alterados': len(alterados), 'inalterados': len(comuns) - len(alterados)}
+    print(f"{filename}: {resumo['inseridos']} sócios novos, {resumo['alterados']} alterados, {resumo['inalterados']} sem alteração")
+    return resumo
+
+
+def generate_client_list(filename: str = 'backup_cliente.csv') -> None:
+    df = ler_export_socios(filename)
+
+    # Salva no formato Parquet, junto com o índice usado na junção com os lançamentos
+    salvar_lista_socios(df)
 
-    # Salva no formato Parquet
-    df.to_parquet('lista_de_socios.parquet')
+def executar(args) -> None:
+    # Chamado pelo cli.py (subcomando members); os argumentos são definidos lá
+    if args.upsert:
+        atualizar_lista_socios(filename=args.arquivo)
+    else:
+        generate_client_list(filename=args.arquivo)
 
 if __name__ == '__main__':
-    generate_client_list(filename='backup_cliente_20231129.csv')
\ No newline at end of file
+    import sys
+    import cli
+    cli.main(['members', *sys.argv[1:]])
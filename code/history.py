@@ -0,0 +1,154 @@
+import glob
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import incremental
+import metrics
+from exporters import exportar
+from ledger import COLUNAS_CATEGORICAS, OPCOES_CSV
+
+DIRETORIO_HISTORICO = '../historico'
+CAMINHO_DATASET = os.path.join(DIRETORIO_HISTORICO, 'lancamentos')
+PADRAO_BACKUPS = 'backup_granatum_*.csv'
+
+COLUNAS_PARTICAO = ['ano', 'mes']
+COLUNAS_SOCIO = ['Cliente/Fornecedor', 'Documento cliente/fornecedor']
+SEM_CATEGORIA = 'Sem categoria'
+
+
+def listar_backups(padrao: str = PADRAO_BACKUPS) -> List[str]:
+    # Backups em ../update; a data no nome (AAAAMMDD) deixa a ordem alfabética cronológica
+    return sorted(os.path.basename(caminho) for caminho in glob.glob(os.path.join('../update', padrao)))
+
+
+def ler_backup(filename: str) -> pd.DataFrame:
+    # Executado nos processos do pool: lê o backup inteiro (todas as formas de
+    # pagamento, é um extrato de contribuições), calcula a chave de cada
+    # lançamento e a partição pelo vencimento
+    df = pd.read_csv(f'../update/{filename}', **OPCOES_CSV)
+    df = df[df['Cliente/Fornecedor'] != 'GRANATUM LTDA - EPP'].reset_index(drop=True)
+    df['chave'] = incremental.chaves_lancamentos(df)['chave'].to_numpy()
+
+    vencimento = pd.to_datetime(df['Data de vencimento'], format='%d/%m/%Y', errors='coerce')
+    sem_data = vencimento.isna()
+    if sem_data.any():
+        print(f'{filename}: {int(sem_data.sum())} lançamentos sem data de vencimento válida ignorados')
+        df, vencimento = df[~sem_data], vencimento[~sem_data]
+    df['ano'] = vencimento.dt.year.to_numpy()
+    df['mes'] = vencimento.dt.month.to_numpy()
+
+    # Texto em vez de categórico: cada backup teria o seu dicionário, e os
+    # arquivos do dataset precisam do mesmo esquema
+    for coluna in COLUNAS_CATEGORICAS:
+        df[coluna] = df[coluna].astype(object)
+    df['backup'] = filename
+    return df
+
+
+def _gravar(df: pd.DataFrame, destino: str, filename: str) -> None:
+    # Um arquivo por backup em cada partição; o nome evita sobrescrever os de outros backups
+    prefixo = os.path.splitext(filename)[0]
+    df.to_parquet(destino, partition_cols=COLUNAS_PARTICAO, index=False, basename_template=f'{prefixo}-{{i}}.parquet')
+
+
+@metrics.etapa('carregar_historico')
+def carregar_historico(arquivos: Sequence[str], processos: Optional[int] = None, destino: str = CAMINHO_DATASET) -> dict:
+    # Lê os backups em paralelo e grava um dataset Parquet particionado por
+    # ano/mês de vencimento. Backups mensais se sobrepõem: um lançamento (mesma
+    # chave do incremental) fica só com a versão do backup mais recente, então
+    # os backups são consumidos do mais novo para o mais antigo
+    arquivos = sorted(arquivos, reverse=True)
+    processos = processos or os.cpu_count() or 1
+    temporario = f'{destino}.tmp'
+    shutil.rmtree(temporario, ignore_errors=True)
+
+    vistas = np.array([], dtype=np.uint64)
+    resumo = {'backups': len(arquivos), 'lidos': 0, 'gravados': 0, 'repetidos': 0}
+
+    def consumir(filename: str, df: pd.DataFrame) -> None:
+        nonlocal vistas
+        chaves = df['chave'].to_numpy()
+        repetido = np.isin(chaves, vistas)
+        vistas = np.union1d(vistas, chaves)
+        if not repetido.all():
+            _gravar(df[~repetido], temporario, filename)
+        resumo['lidos'] += len(df)
+        resumo['gravados'] += int((~repetido).sum())
+        resumo['repetidos'] += int(repetido.sum())
+        print(f'{filename}: {len(df)} lançamentos, {int(repetido.sum())} já presentes em backups mais novos')
+
+    # Poucos backups lidos à frente, para não acumular todos em memória
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        pendentes = deque()
+        for filename in arquivos:
+            pendentes.append((filename, executor.submit(ler_backup, filename)))
+            if len(pendentes) > processos:
+                filename, futuro = pendentes.popleft()
+                consumir(filename, futuro.result())
+        while pendentes:
+            filename, futuro = pendentes.popleft()
+            consumir(filename, futuro.result())
+
+    # Troca o dataset inteiro de uma vez: leitores nunca veem um histórico pela metade
+    os.makedirs(temporario, exist_ok=True)
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporario, destino)
+    return resumo
+
+
+@metrics.etapa('totais_anuais')
+def totais_anuais(ano: Optional[int] = None, origem: str = CAMINHO_DATASET, tamanho_lote: int = 256_000) -> pd.DataFrame:
+    # Total por sócio, ano e Categoria (uma coluna por categoria). O dataset é
+    # lido em lotes e cada lote vira somas parciais em centavos; só as somas
+    # ficam em memória, nunca o histórico inteiro
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(origem, format='parquet', partitioning='hive')
+    filtro = ds.field('ano') == ano if ano is not None else None
+    chaves = ['ano', *COLUNAS_SOCIO, 'Categoria']
+
+    parciais = []
+    for lote in dataset.to_batches(columns=[*chaves, 'Valor'], filter=filtro, batch_size=tamanho_lote):
+        df = lote.to_pandas()
+        df['Categoria'] = df['Categoria'].fillna(SEM_CATEGORIA)
+        df['Documento cliente/fornecedor'] = df['Documento cliente/fornecedor'].fillna('')
+        df['Valor'] = np.rint(df['Valor'].fillna(0).to_numpy() * 100).astype(np.int64)
+        parciais.append(df.groupby(chaves, sort=False)['Valor'].sum())
+        if len(parciais) >= 32:
+            parciais = [pd.concat(parciais).groupby(level=chaves, sort=False).sum()]
+
+    if not parciais:
+        return pd.DataFrame(columns=[*chaves[:-1], 'Total'])
+
+    centavos = pd.concat(parciais).groupby(level=chaves).sum()
+    totais = centavos.unstack('Categoria', fill_value=0)
+    totais['Total'] = totais.sum(axis=1)
+    totais = (totais / 100).reset_index()
+    totais.columns.name = None
+    return totais
+
+
+def executar(args) -> None:
+    # Chamado pelo cli.py (subcomando historico); os argumentos são definidos lá
+    if args.metricas:
+        metrics.ativar(args.metricas)
+
+    if not args.sem_carga:
+        arquivos = args.arquivos or listar_backups()
+        if not arquivos:
+            raise SystemExit(f'Nenhum backup {PADRAO_BACKUPS} em ../update')
+        resumo = carregar_historico(arquivos, args.processos)
+        print(f"{resumo['backups']} backups, {resumo['gravados']} lançamentos no histórico "
+              f"({resumo['repetidos']} repetidos entre backups descartados)")
+
+    if not os.path.isdir(CAMINHO_DATASET):
+        raise SystemExit(f'Histórico não encontrado em {CAMINHO_DATASET}; rode sem --sem-carga')
+    totais = totais_anuais(args.ano)
+    caminho = exportar(totais, os.path.join(DIRETORIO_HISTORICO, f'totais_{args.ano or "anuais"}'), args.formato)
+    print(f'Totais de {len(totais)} sócios/ano gravados em {caminho}')
@@ -0,0 +1,138 @@
+import re
+from typing import List, Set, Tuple
+
+# O Gmail corta ("[Mensagem cortada]") emails com HTML acima de ~102 KB
+LIMITE_BYTES = 102 * 1024
+
+# Tags de bloco: o espaço em volta delas não aparece na renderização
+_BLOCOS = (
+    'html|head|body|meta|title|style|table|thead|tbody|tfoot|tr|td|th|div|p|br|hr|'
+    'h[1-6]|ul|ol|li|img'
+)
+_ESPACO_EM_BLOCO = re.compile(rf'\s*(</?(?:{_BLOCOS})\b[^>]*>)\s*', re.IGNORECASE)
+_COMENTARIO_HTML = re.compile(r'<!--(?!\[if)(?!<!\[endif).*?-->', re.DOTALL)
+_COMENTARIO_CSS = re.compile(r'/\*.*?\*/', re.DOTALL)
+_ESTILO = re.compile(r'(<style[^>]*>)(.*?)(</style>)', re.DOTALL | re.IGNORECASE)
+_ATRIBUTO_ESTILO = re.compile(r'\sstyle="([^"]*)"')
+_ATRIBUTO_CLASSE = re.compile(r'\sclass="([^"]*)"')
+_ATRIBUTO_ID = re.compile(r'\sid="([^"]*)"')
+_TAG = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)')
+_PSEUDO = re.compile(r'::?[a-zA-Z-]+(\([^)]*\))?')
+
+
+def minificar_css(css: str) -> str:
+    css = _COMENTARIO_CSS.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r'\s*:\s*', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def _declaracoes(estilo: str) -> str:
+    # Conteúdo de um atributo style: mesmas regras do CSS, sem o último ';'
+    return minificar_css(estilo).rstrip(';')
+
+
+def _blocos_css(css: str) -> List[Tuple[str, object]]:
+    # Divide o CSS em (seletores, declarações) e (@regra, blocos internos)
+    blocos = []
+    posicao = 0
+    while True:
+        abre = css.find('{', posicao)
+        if abre < 0:
+            return blocos
+        prefixo = css[posicao:abre].strip()
+        if prefixo.startswith('@'):
+            profundidade, fim = 1, abre + 1
+            while profundidade and fim < len(css):
+                profundidade += {'{': 1, '}': -1}.get(css[fim], 0)
+                fim += 1
+            blocos.append((prefixo, _blocos_css(css[abre + 1:fim - 1])))
+        else:
+            fim = css.index('}', abre) + 1
+            blocos.append((prefixo, css[abre + 1:fim - 1]))
+        posicao = fim
+
+
+def _seletor_usado(seletor: str, tags: Set[str], classes: Set[str], ids: Set[str]) -> bool:
+    # Conservador: só descarta o seletor se ele citar uma tag, classe ou id que
+    # não existe no documento (a relação entre os elementos não é conferida)
+    seletor = _PSEUDO.sub('', seletor)
+    return (
+        all(c in classes for c in re.findall(r'\.([\w-]+)', seletor))
+        and all(i in ids for i in re.findall(r'#([\w-]+)', seletor))
+        and all(t.lower() in tags for t in re.findall(r'(?:^|[\s>+~])([a-zA-Z][a-zA-Z0-9]*)', seletor))
+    )
+
+
+def _filtrar_css(blocos, tags: Set[str], classes: Set[str], ids: Set[str]) -> str:
+    saida = []
+    for prefixo, conteudo in blocos:
+        if isinstance(conteudo, list):
+            interno = _filtrar_css(conteudo, tags, classes, ids)
+            if interno:
+                saida.append(f'{prefixo}{{{interno}}}')
+            continue
+        seletores = [s for s in prefixo.split(',') if _seletor_usado(s.strip(), tags, classes, ids)]
+        if seletores and conteudo.strip():
+            saida.append(f'{",".join(s.strip() for s in seletores)}{{{conteudo}}}')
+    return minificar_css(''.join(saida))
+
+
+def _usados(html: str) -> Tuple[Set[str], Set[str], Set[str]]:
+    corpo = _ESTILO.sub('', html)
+    tags = {t.lower() for t in _TAG.findall(corpo)}
+    classes = {c for valor in _ATRIBUTO_CLASSE.findall(corpo) for c in valor.split()}
+    ids = set(_ATRIBUTO_ID.findall(corpo))
+    return tags, classes, ids
+
+
+def remover_css_nao_usado(html: str) -> str:
+    # Regras cujos seletores não batem com nada do email saem do <style>; isso
+    # inclui as classes que só os clientes de webmail criam (.ExternalClass,
+    # #MessageViewBody), que não existem no HTML que enviamos
+    tags, classes, ids = _usados(html)
+
+    def filtrar(m: re.Match) -> str:
+        css = _filtrar_css(_blocos_css(_COMENTARIO_CSS.sub('', m.group(2))), tags, classes, ids)
+        return f'{m.group(1)}{css}{m.group(3)}' if css else ''
+
+    return _ESTILO.sub(filtrar, html)
+
+
+def remover_atributos_nao_usados(html: str) -> str:
+    # Depois do inline do premailer, os ids e classes gerados pelo Styler do
+    # pandas (T_descritivo_row0_col0, "data row0 col0") não servem para nada
+    # e se repetem em cada célula
+    estilos = ''.join(m.group(2) for m in _ESTILO.finditer(html))
+    classes = set(re.findall(r'\.([\w-]+)', estilos))
+    ids = set(re.findall(r'#([\w-]+)', estilos)) | set(re.findall(r'href="#([^"]+)"', html))
+
+    def classe(m: re.Match) -> str:
+        usadas = [c for c in m.group(1).split() if c in classes]
+        return f' class="{" ".join(usadas)}"' if usadas else ''
+
+    html = _ATRIBUTO_CLASSE.sub(classe, html)
+    return _ATRIBUTO_ID.sub(lambda m: m.group(0) if m.group(1) in ids else '', html)
+
+
+def minificar_html(html: str) -> str:
+    # Remove comentários (menos os condicionais do Outlook), o espaço em volta
+    # das tags de bloco e reduz o CSS, inclusive o dos atributos style
+    html = _COMENTARIO_HTML.sub('', html)
+    html = _ESTILO.sub(lambda m: m.group(1) + minificar_css(m.group(2)) + m.group(3), html)
+    html = _ATRIBUTO_ESTILO.sub(lambda m: f' style="{_declaracoes(m.group(1))}"', html)
+    html = re.sub(r'\s+', ' ', html)
+    return _ESPACO_EM_BLOCO.sub(r'\1', html).strip()
+
+
+def otimizar_html(html: str) -> str:
+    return minificar_html(remover_atributos_nao_usados(remover_css_nao_usado(html)))
+
+
+def tamanho(html: str) -> int:
+    return len(html.encode('utf-8'))
+
+
+def dentro_do_limite(html: str, limite: int = LIMITE_BYTES) -> bool:
+    return tamanho(html) <= limite
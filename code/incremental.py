@@ -0,0 +1,124 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Set
+
+import numpy as np
+import pandas as pd
+
+import ledger
+
+DIRETORIO_INCREMENTAL = '../incremental'
+
+# Campos que identificam um lançamento entre backups sucessivos
+COLUNAS_CHAVE = [
+    'Cliente/Fornecedor',
+    'Documento cliente/fornecedor',
+    'Data de vencimento',
+    'Descrição',
+    'Categoria',
+    'Forma de pagamento',
+]
+
+# Campos cuja alteração faz o lançamento ser emitido de novo
+COLUNAS_CONTEUDO = ['Valor']
+
+
+def chaves_lancamentos(df: pd.DataFrame) -> pd.DataFrame:
+    # Hash vetorizado dos campos de identificação; lançamentos idênticos no
+    # mesmo backup são diferenciados pela ordem de ocorrência
+    base = pd.util.hash_pandas_object(df[COLUNAS_CHAVE].astype(str), index=False).to_numpy()
+    ocorrencia = pd.Series(base).groupby(base).cumcount().to_numpy().astype(np.uint64)
+    chave = pd.util.hash_pandas_object(pd.DataFrame({'base': base, 'ocorrencia': ocorrencia}), index=False).to_numpy()
+    conteudo = pd.util.hash_pandas_object(df[COLUNAS_CONTEUDO], index=False).to_numpy()
+    return pd.DataFrame({'chave': chave, 'conteudo': conteudo})
+
+
+def _caminho_snapshot(etapa: str) -> str:
+    return os.path.join(DIRETORIO_INCREMENTAL, f'{etapa}_snapshot.parquet')
+
+
+def _caminho_emitidos(etapa: str) -> str:
+    return os.path.join(DIRETORIO_INCREMENTAL, f'{etapa}_emitidos.parquet')
+
+
+@dataclass
+class Delta:
+    etapa: str
+    filename: str
+    df: pd.DataFrame
+    snapshot: pd.DataFrame
+    novos: int
+    alterados: int
+    removidos: int
+    # Snapshot anterior e chaves de todos os lançamentos novos ou alterados,
+    # inclusive os sem sócio correspondente (que não estão em ``df``)
+    anterior: pd.DataFrame
+    chaves_delta: np.ndarray
+
+    def registrar(self, socios: Optional[Set[str]] = None, chaves: Optional[np.ndarray] = None) -> None:
+        # Só grava o novo snapshot depois que boletos/emails foram gerados. Com
+        # ``socios`` e/ou ``chaves``, só os lançamentos desses sócios / com essas
+        # chaves contam como processados: os demais voltam ao estado anterior
+        # e aparecem de novo no próximo delta
+        snapshot, df = self.snapshot, self.df
+        if socios is not None:
+            df = df[df['Cliente/Fornecedor'].isin(socios)]
+        if chaves is not None:
+            df = df[df['chave'].isin(chaves)]
+        if socios is not None or chaves is not None:
+            pendentes = np.setdiff1d(self.chaves_delta, df['chave'].to_numpy())
+            snapshot = pd.concat([
+                snapshot[~snapshot['chave'].isin(pendentes)],
+                self.anterior[self.anterior['chave'].isin(pendentes)],
+            ], ignore_index=True)
+
+        os.makedirs(DIRETORIO_INCREMENTAL, exist_ok=True)
+        snapshot.to_parquet(_caminho_snapshot(self.etapa), index=False)
+
+        if df.empty:
+            return
+        emitidos = df[['chave', 'situacao', 'Cliente/Fornecedor', 'Data de vencimento', 'Descrição', 'Valor']].copy()
+        emitidos['backup'] = self.filename
+        emitidos['registrado_em'] = datetime.now()
+        caminho = _caminho_emitidos(self.etapa)
+        if os.path.exists(caminho):
+            emitidos = pd.concat([pd.read_parquet(caminho), emitidos], ignore_index=True)
+        emitidos.to_parquet(caminho, index=False)
+
+
+def calcular_delta(filename: str, etapa: str) -> Delta:
+    # Compara o backup novo com o último processado por esta etapa e junta
+    # com os sócios apenas os lançamentos novos ou alterados
+    df = ledger.ler_lancamentos(filename)
+    # O valor fica no snapshot para mostrar o anterior dos lançamentos alterados
+    chaves = chaves_lancamentos(df).assign(valor=df['Valor'].to_numpy())
+
+    caminho = _caminho_snapshot(etapa)
+    if os.path.exists(caminho):
+        anterior = pd.read_parquet(caminho)
+    else:
+        anterior = pd.DataFrame({'chave': np.array([], dtype=np.uint64), 'conteudo': np.array([], dtype=np.uint64)})
+    if 'valor' not in anterior:
+        # Snapshot gravado antes de o valor ser guardado
+        anterior['valor'] = np.nan
+
+    conteudo_anterior = pd.Series(anterior['conteudo'].to_numpy(), index=anterior['chave'].to_numpy())
+    existia = chaves['chave'].isin(anterior['chave']).to_numpy()
+    novos = ~existia
+    alterados = existia.copy()
+    alterados[existia] = conteudo_anterior.reindex(chaves['chave'].to_numpy()[existia]).to_numpy() != chaves['conteudo'].to_numpy()[existia]
+    removidos = int((~anterior['chave'].isin(chaves['chave'])).sum())
+
+    n_novos, n_alterados = int(novos.sum()), int(alterados.sum())
+    mudou = novos | alterados
+    delta = df[mudou].copy()
+    delta['chave'] = chaves['chave'].to_numpy()[mudou]
+    delta['situacao'] = np.where(novos[mudou], 'novo', 'alterado')
+    valor_anterior = pd.Series(anterior['valor'].to_numpy(), index=anterior['chave'].to_numpy())
+    delta['valor_anterior'] = valor_anterior.reindex(delta['chave'].to_numpy()).to_numpy()
+
+    df_complete = ledger.juntar_socios(delta, extras=['chave', 'situacao', 'valor_anterior'])
+
+    print(f'{filename}: {n_novos} lançamentos novos, {n_alterados} alterados, {removidos} removidos')
+    return Delta(etapa, filename, df_complete, chaves, n_novos, n_alterados, removidos, anterior, delta['chave'].to_numpy())
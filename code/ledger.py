@@ -0,0 +1,182 @@
+import os
+import threading
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import cache
+import metrics
+from generate_client_list import (
+    CAMINHO_INDICE,
+    CAMINHO_SOCIOS,
+    COLUNAS_JUNCAO,
+    chave_documento,
+    gerar_indice_socios,
+    ler_socios,
+    normalizar_nome,
+)
+
+# Colunas do backup do Granatum usadas pelos scripts
+COLUNAS_LANCAMENTOS = [
+    'Cliente/Fornecedor',
+    'Data de vencimento',
+    'Descrição',
+    'Valor',
+    'Documento cliente/fornecedor',
+    'Forma de pagamento',
+    'Categoria',
+]
+
+COLUNAS_CATEGORICAS = ['Cliente/Fornecedor', 'Forma de pagamento', 'Categoria']
+
+TIPOS_LANCAMENTOS = {
+    'Cliente/Fornecedor': 'category',
+    'Forma de pagamento': 'category',
+    'Categoria': 'category',
+    'Data de vencimento': str,
+    'Descrição': str,
+    'Documento cliente/fornecedor': str,
+    'Valor': float,
+}
+
+# Opções de leitura do backup (Valor vem em formato brasileiro: 1.234,56)
+OPCOES_CSV = dict(
+    encoding='latin-1',
+    sep=';',
+    usecols=COLUNAS_LANCAMENTOS,
+    dtype=TIPOS_LANCAMENTOS,
+    decimal=',',
+    thousands='.',
+)
+
+FORMAS_DE_PAGAMENTO_BOLETO = ['Boleto - Granatum Pagamentos', 'Boleto ProsperarBank']
+
+
+def _filtrar_boletos(df: pd.DataFrame) -> pd.DataFrame:
+    # Selecionando somente o tipo de pagamento e excluindo o cliente Granatum
+    df = df[df['Forma de pagamento'].isin(FORMAS_DE_PAGAMENTO_BOLETO) & (df['Cliente/Fornecedor'] != 'GRANATUM LTDA - EPP')]
+
+    # Alterando o valor do boletos para R$ 4,50
+    df = df.copy()
+    df.loc[df['Categoria'] == '005 - Tx Boleto', 'Valor'] = 4.50
+
+    return df
+
+
+def ler_lancamentos(filename: str, chunksize: Optional[int] = None) -> pd.DataFrame:
+    # Lendo CSV de Lançamentos do Granatum, só com as colunas necessárias e
+    # já com os tipos definidos
+    if chunksize is None:
+        df = _filtrar_boletos(pd.read_csv(f'../update/{filename}', **OPCOES_CSV))
+    else:
+        # Exportações muito grandes: filtra bloco a bloco para limitar a memória
+        with pd.read_csv(f'../update/{filename}', chunksize=chunksize, **OPCOES_CSV) as leitor:
+            df = pd.concat([_filtrar_boletos(bloco) for bloco in leitor], ignore_index=True)
+
+    # O leitor junta as categorias de cada bloco interno na ordem em que aparecem;
+    # ordena para o groupby (e o ID Externo) seguir a ordem alfabética dos nomes
+    for coluna in COLUNAS_CATEGORICAS:
+        categorias = df[coluna].astype('category').cat
+        df[coluna] = categorias.reorder_categories(sorted(categorias.categories))
+
+    return df
+
+
+@metrics.etapa('gerar_tabela_completa')
+def gerar_tabela_completa(filename: str = 'backup_granatum.csv', chunksize: Optional[int] = None, usar_cache: bool = True) -> pd.DataFrame:
+    if not usar_cache or cache.cache_desativado():
+        return _gerar_tabela_completa(filename, chunksize)
+
+    # Reaproveita o resultado se nem o backup nem a lista de sócios mudaram
+    chave = cache.chave(f'../update/{filename}', CAMINHO_SOCIOS, contexto='gerar_tabela_completa')
+    df_complete = cache.ler(chave)
+    if df_complete is None:
+        df_complete = _gerar_tabela_completa(filename, chunksize)
+        cache.gravar(chave, df_complete)
+    return df_complete
+
+
+def _gerar_tabela_completa(filename: str, chunksize: Optional[int] = None) -> pd.DataFrame:
+    return juntar_socios(ler_lancamentos(filename, chunksize=chunksize))
+
+
+def juntar_socios(df: pd.DataFrame, extras: Sequence[str] = ()) -> pd.DataFrame:
+    # Selecionando as colunas necessárias
+    df = df[['Cliente/Fornecedor', 'Data de vencimento', 'Descrição', 'Valor', 'Documento cliente/fornecedor', *extras]].copy()
+    df['Cliente/Fornecedor'] = df['Cliente/Fornecedor'].cat.remove_unused_categories()
+
+    # Colocando todos os Vencimentos no dia 10
+    df['Data de vencimento'] = '10' + df['Data de vencimento'].str[2:]
+
+    # Lendo Lista de Sócios
+    df_socios, indice = socios_em_memoria()
+
+    # Localiza o sócio de cada lançamento pelo documento (chave inteira) e,
+    # quando não houver documento correspondente, pelo nome normalizado
+    documentos = chave_documento(df['Documento cliente/fornecedor']).fillna(-1).astype('int64')
+    compartilhado = (indice['documento'].notna() & indice['documento'].duplicated(keep=False)).to_numpy()
+    unicos = indice[~compartilhado]
+    posicoes = _localizar(unicos['documento'], documentos, unicos['posicao'])
+
+    # Documento de mais de um sócio (titular e dependentes): decide pelo documento + nome
+    ambiguos = documentos.isin(indice['documento'][compartilhado]).to_numpy()
+    if ambiguos.any():
+        comuns = indice[compartilhado]
+        chaves_comuns = comuns['documento'].astype('int64').astype(str) + '|' + comuns['nome']
+        chaves = documentos[ambiguos].astype(str) + '|' + normalizar_nome(df['Cliente/Fornecedor'][ambiguos])
+        posicoes[ambiguos] = _localizar(chaves_comuns, chaves, comuns['posicao'])
+
+    sem_documento = posicoes < 0
+    if sem_documento.any():
+        nomes = normalizar_nome(df['Cliente/Fornecedor'][sem_documento])
+        posicoes[sem_documento] = _localizar(indice['nome'], nomes, indice['posicao'])
+
+    encontrados = posicoes >= 0
+    nao_encontrados = int((~encontrados).sum())
+    if nao_encontrados:
+        exemplos = ', '.join(map(str, df.loc[~encontrados, 'Cliente/Fornecedor'].unique()[:10]))
+        print(f'{nao_encontrados} lançamentos sem sócio correspondente: {exemplos}')
+
+    # Unindo as informações das Tabelas de Lançamentos e de Sócios
+    df_complete = pd.concat([
+        df[encontrados].reset_index(drop=True),
+        df_socios.iloc[posicoes[encontrados]].reset_index(drop=True),
+    ], axis=1)
+    df_complete.attrs['nao_encontrados'] = nao_encontrados
+
+    return df_complete
+
+
+# Lista de sócios e índice já lidos, enquanto o Parquet não mudar
+_socios_carregados: dict = {}
+_trava_socios = threading.Lock()
+
+
+def socios_em_memoria() -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Processos de longa duração (vigia de pastas) juntam vários backups sem reler a lista
+    estado = os.stat(CAMINHO_SOCIOS)
+    assinatura = (estado.st_mtime_ns, estado.st_size)
+    with _trava_socios:
+        if _socios_carregados.get('assinatura') != assinatura:
+            df_socios = ler_socios(COLUNAS_JUNCAO)
+            _socios_carregados.update(assinatura=assinatura, socios=df_socios, indice=carregar_indice_socios(df_socios))
+        return _socios_carregados['socios'], _socios_carregados['indice']
+
+
+def carregar_indice_socios(df_socios: pd.DataFrame) -> pd.DataFrame:
+    # Usa o índice persistido se estiver em dia com a lista de sócios
+    if os.path.exists(CAMINHO_INDICE) and os.path.getmtime(CAMINHO_INDICE) >= os.path.getmtime(CAMINHO_SOCIOS):
+        indice = pd.read_parquet(CAMINHO_INDICE)
+        if len(indice) == len(df_socios):
+            return indice
+    return gerar_indice_socios(df_socios)
+
+
+def _localizar(chaves_indice: pd.Series, chaves: pd.Series, posicoes: pd.Series) -> np.ndarray:
+    # Busca por hash: primeira ocorrência de cada chave no índice
+    validas = chaves_indice.notna().to_numpy()
+    unicas = ~chaves_indice[validas].duplicated().to_numpy()
+    tabela = pd.Index(chaves_indice[validas][unicas].to_numpy())
+    encontrados = tabela.get_indexer(chaves.to_numpy())
+    return np.where(encontrados >= 0, posicoes[validas][unicas].to_numpy()[encontrados], -1)
@@ -0,0 +1,136 @@
+import os
+import random
+import tempfile
+import time
+from array import array
+from collections import Counter
+from typing import List
+
+import config
+import metrics
+import send_mail
+from member_groups import ExtratoSocio
+from outbox import CaixaSaida
+from smtp_sink import SumidouroSMTP
+
+DESCRICOES = ['Mensalidade', 'Fundo de Reforma', 'Tx Boleto', 'Contribuição Extra', 'Festa']
+
+# Credenciais do servidor de teste; nada sai da máquina
+USUARIO_TESTE = 'carga@localhost'
+SENHA_TESTE = 'carga'
+
+
+def socios_ficticios(n_socios: int, linhas_por_socio: int = 4, seed: int = 42) -> List[ExtratoSocio]:
+    # Um destinatário diferente por sócio, para o servidor de teste detectar reenvios duplicados
+    rng = random.Random(seed)
+    return [
+        ExtratoSocio(
+            f'SÓCIO DE CARGA {i}',
+            f'socio{i}@carga.localhost',
+            '10/12/2023',
+            tuple(rng.choice(DESCRICOES) for _ in range(linhas_por_socio)),
+            array('q', (rng.randint(100, 250_000) for _ in range(linhas_por_socio))),
+        )
+        for i in range(n_socios)
+    ]
+
+
+def _apontar_para(sumidouro: SumidouroSMTP) -> None:
+    # send_mail lê o servidor da configuração: as variáveis de ambiente têm
+    # prioridade sobre o .env, então o envio real fica inalcançável
+    os.environ.update(
+        SMTP_SERVER=sumidouro.host,
+        SMTP_PORT=str(sumidouro.porta),
+        SENDER_EMAIL=USUARIO_TESTE,
+        SENDER_PASS=SENHA_TESTE,
+        # Sem certificado o servidor de teste não oferece STARTTLS
+        SMTP_PLAIN_LOCAL='0' if sumidouro.contexto_tls else '1',
+    )
+    config.carregar.cache_clear()
+
+
+def executar_carga(
+    sumidouro: SumidouroSMTP,
+    n_mensagens: int,
+    modo: str = 'lote',
+    sessoes: int = 4,
+    por_segundo: float = 1000.0,
+    processos: int = None,
+) -> dict:
+    # Renderiza e envia pelas mesmas funções do subcomando mail
+    _apontar_para(sumidouro)
+    grupos = socios_ficticios(n_mensagens)
+
+    inicio = time.perf_counter()
+    if modo == 'outbox':
+        caixa = CaixaSaida(os.path.join(tempfile.mkdtemp(prefix='carga_'), 'caixa_saida.sqlite'))
+        send_mail.enfileirar_mailing(caixa, 'carga', grupos, processos)
+    else:
+        mensagens = list(send_mail.renderizar_mensagens(grupos, processos))
+    renderizacao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    if modo == 'outbox':
+        resultados = send_mail.send_mail_outbox(caixa, 'carga')
+        caixa.fechar()
+    elif modo == 'async':
+        resultados = send_mail.send_mail_async(mensagens, sessoes, por_segundo)
+    else:
+        resultados = send_mail.send_mail_batch(mensagens)
+    envio = time.perf_counter() - inicio
+
+    enviados = [r for r in resultados if r.enviado]
+    falhas = Counter(r.codigo for r in resultados if not r.enviado)
+    smtp = metrics.relatorio()['smtp']
+    return {
+        'modo': modo,
+        'mensagens': n_mensagens,
+        'enviadas': len(enviados),
+        'falhas': {str(codigo or 'conexão'): n for codigo, n in falhas.items()},
+        'tentativas': sum(r.tentativas for r in resultados),
+        'renderizacao_segundos': renderizacao,
+        'envio_segundos': envio,
+        'mensagens_por_segundo': len(enviados) / envio if envio else None,
+        'latencia_p50': smtp['latencia_p50'],
+        'latencia_p99': smtp['latencia_p99'],
+        'bytes_por_mensagem': smtp['bytes_por_mensagem'],
+        'servidor': dict(sumidouro.contagem),
+        'duplicadas': sumidouro.duplicadas,
+    }
+
+
+def _ms(segundos) -> str:
+    return f'{segundos * 1e3:.1f} ms' if segundos is not None else '-'
+
+
+def executar(args) -> None:
+    # Chamado pelo cli.py (subcomando carga); os argumentos são definidos lá
+    metrics.ativar(args.metricas)
+    sumidouro = SumidouroSMTP(
+        porta=0,
+        usuario=USUARIO_TESTE,
+        senha=SENHA_TESTE,
+        certificado=args.certificado,
+        chave=args.chave,
+        latencia=args.latencia,
+        variacao=args.variacao,
+        falha_4xx=args.falha_4xx,
+        falha_5xx=args.falha_5xx,
+        queda=args.queda,
+        seed=args.seed,
+    )
+    with sumidouro:
+        r = executar_carga(sumidouro, args.mensagens, args.modo, args.sessoes, args.por_segundo, args.processos)
+
+    print(f"Modo {r['modo']}: {r['enviadas']}/{r['mensagens']} enviadas em {r['envio_segundos']:.2f} s "
+          f"({r['mensagens_por_segundo'] or 0:.1f} msg/s); renderização em {r['renderizacao_segundos']:.2f} s")
+    print(f"Latência por tentativa: p50 {_ms(r['latencia_p50'])}, p99 {_ms(r['latencia_p99'])}")
+    print(f"Tentativas: {r['tentativas']} ({r['tentativas'] - r['mensagens']} reenvios)")
+    if r['falhas']:
+        print('Falhas: ' + ', '.join(f'{n} com {codigo}' for codigo, n in r['falhas'].items()))
+    servidor = r['servidor']
+    print(f"Servidor: {servidor.get('recebidas', 0)} aceitas em {servidor.get('sessoes', 0)} sessões, "
+          f"{servidor.get('recusadas_4xx', 0)} respostas 4xx, {servidor.get('recusadas_5xx', 0)} respostas 5xx, "
+          f"{servidor.get('quedas', 0)} conexões derrubadas, {r['duplicadas']} entregas duplicadas")
+    if r['bytes_por_mensagem']:
+        print(f"Tamanho médio por mensagem: {r['bytes_por_mensagem'] / 1024:.1f} KB")
@@ -0,0 +1,641 @@
+import html
+import re
+from typing import Callable, Optional, Sequence
+
+from html_optimizer import otimizar_html
+
+# Link padrão do botão "Visualizar Boleto"
+BOLETO_URL_PADRAO = 'https://sales.prosperarbank.secure.srv.br/billet/checkout/58d5e823-0eeb-4a15-832f-11de57c2b901'
+
+# Linha digitável para pagamento no bankline
+CODIGO_BARRAS = '34191.09008 07085.650393 32500.060002 9 94690000059660'
+
+# Estilos aplicados na tabela de lançamentos (inlinados pelo premailer)
+ESTILOS_TABELA = [
+    {'selector': 'th',
+     'props': [('border-bottom', '1px solid #dddddd'), ('text-align', 'right'),
+               ('padding', '8px')]},
+    {'selector': 'td',
+     'props': [('border-bottom', '1px solid #dddddd'), ('text-align', 'right'),
+               ('padding', '8px')]},
+    {'selector': 'td:first-child',
+     'props': [('text-align', 'left')]},
+    {'selector': 'th:first-child',
+     'props': [('text-align', 'left')]}
+]
+
+# Trechos estáticos do email, entre as partes variáveis de cada sócio
+_ANTES_NOME = '''
+  <!doctype html>
+  <html>
+    <head>
+      <meta name="viewport" content="width=device-width, initial-scale=1.0"/>
+      <meta http-equiv="Content-Type" content="text/html; charset=UTF-8" />
+      <title>Simple Transactional Email</title>
+      <style>
+        /* -------------------------------------
+            GLOBAL RESETS
+        ------------------------------------- */
+        
+        /*All the styling goes here*/
+        
+        img {
+          border: none;
+          -ms-interpolation-mode: bicubic;
+          max-width: 100%; 
+        }
+
+        body {
+          background-color: #f6f6f6;
+          font-family: sans-serif;
+          -webkit-font-smoothing: antialiased;
+          font-size: 14px;
+          line-height: 1.4;
+          margin: 0;
+          padding: 0;
+          -ms-text-size-adjust: 100%;
+          -webkit-text-size-adjust: 100%; 
+        }
+
+        table {
+          border-collapse: collapse;
+          mso-table-lspace: 0pt;
+          mso-table-rspace: 0pt;
+          width: 100%; }
+          table td {
+            font-family: sans-serif;
+            font-size: 14px;
+            vertical-align: top; 
+        }
+
+        /* -------------------------------------
+            BODY & CONTAINER
+        ------------------------------------- */
+
+        .body {
+          background-color: #f6f6f6;
+          width: 100%; 
+        }
+
+        /* Set a max-width, and make it display as block so it will automatically stretch to that width, but will also shrink down on a phone or something */
+        .container {
+          display: block;
+          margin: 0 auto !important;
+          /* makes it centered */
+          max-width: 580px;
+          padding: 10px;
+          width: 580px; 
+        }
+
+        /* This should also be a block element, so that it will fill 100% of the .container */
+        .content {
+          box-sizing: border-box;
+          display: block;
+          margin: 0 auto;
+          max-width: 580px;
+          padding: 10px; 
+        }
+
+        /* -------------------------------------
+            HEADER, FOOTER, MAIN
+        ------------------------------------- */
+        .main {
+          background: #ffffff;
+          border-radius: 3px;
+          width: 100%; 
+        }
+
+        .wrapper {
+          box-sizing: border-box;
+          padding: 20px; 
+        }
+
+        .content-block {
+          padding-bottom: 10px;
+          padding-top: 10px;
+        }
+
+        .footer {
+          clear: both;
+          margin-top: 10px;
+          text-align: center;
+          width: 100%; 
+        }
+          .footer td,
+          .footer p,
+          .footer span,
+          .footer a {
+            color: #999999;
+            font-size: 12px;
+            text-align: center; 
+        }
+
+        /* -------------------------------------
+            TYPOGRAPHY
+        ------------------------------------- */
+        h1,
+        h2,
+        h3,
+        h4 {
+          color: #000000;
+          font-family: sans-serif;
+          font-weight: 400;
+          line-height: 1.4;
+          margin: 0;
+          margin-bottom: 30px; 
+        }
+
+        h1 {
+          font-size: 35px;
+          font-weight: 300;
+          text-align: center;
+          text-transform: capitalize; 
+        }
+
+        p,
+        ul,
+        ol {
+          font-family: sans-serif;
+          font-size: 14px;
+          font-weight: normal;
+          margin: 0;
+          margin-bottom: 15px; 
+        }
+          p li,
+          ul li,
+          ol li {
+            list-style-position: inside;
+            margin-left: 5px; 
+        }
+
+        a {
+          color: #3498db;
+          text-decoration: underline; 
+        }
+
+        /* -------------------------------------
+            BUTTONS
+        ------------------------------------- */
+        .btn {
+          box-sizing: border-box;
+          width: 100%; }
+          .btn > tbody > tr > td {
+            padding-bottom: 15px; }
+          .btn table {
+            width: auto; 
+        }
+          .btn table td {
+            background-color: #ffffff;
+            border-radius: 5px;
+            text-align: center; 
+        }
+          .btn a {
+            background-color: #ffffff;
+            border: solid 1px #3498db;
+            border-radius: 5px;
+            box-sizing: border-box;
+            color: #3498db;
+            cursor: pointer;
+            display: inline-block;
+            font-size: 14px;
+            font-weight: bold;
+            margin: 0;
+            padding: 12px 25px;
+            text-decoration: none;
+            text-transform: capitalize; 
+        }
+
+        .btn-primary table td {
+          background-color: #3498db; 
+        }
+
+        .btn-primary a {
+          background-color: #3498db;
+          border-color: #3498db;
+          color: #ffffff; 
+        }
+
+        /* -------------------------------------
+            OTHER STYLES THAT MIGHT BE USEFUL
+        ------------------------------------- */
+        .last {
+          margin-bottom: 0; 
+        }
+
+        .first {
+          margin-top: 0; 
+        }
+
+        .align-center {
+          text-align: center; 
+        }
+
+        .align-right {
+          text-align: right; 
+        }
+
+        .align-left {
+          text-align: left; 
+        }
+
+        .clear {
+          clear: both; 
+        }
+
+        .mt0 {
+          margin-top: 0; 
+        }
+
+        .mb0 {
+          margin-bottom: 0; 
+        }
+
+        .preheader {
+          color: transparent;
+          display: none;
+          height: 0;
+          max-height: 0;
+          max-width: 0;
+          opacity: 0;
+          overflow: hidden;
+          mso-hide: all;
+          visibility: hidden;
+          width: 0; 
+        }
+
+        .powered-by a {
+          text-decoration: none; 
+        }
+
+        hr {
+          border: 0;
+          border-bottom: 1px solid #f6f6f6;
+          margin: 20px 0; 
+        }
+
+        /* -------------------------------------
+            RESPONSIVE AND MOBILE FRIENDLY STYLES
+        ------------------------------------- */
+        @media only screen and (max-width: 620px) {
+          table.body h1 {
+            font-size: 28px !important;
+            margin-bottom: 10px !important; 
+          }
+          table.body p,
+          table.body ul,
+          table.body ol,
+          table.body td,
+          table.body span,
+          table.body a {
+            font-size: 16px !important; 
+          }
+          table.body .wrapper,
+          table.body .article {
+            padding: 10px !important; 
+          }
+          table.body .content {
+            padding: 0 !important; 
+          }
+          table.body .container {
+            padding: 0 !important;
+            width: 100% !important; 
+          }
+          table.body .main {
+            border-left-width: 0 !important;
+            border-radius: 0 !important;
+            border-right-width: 0 !important; 
+          }
+          table.body .btn table {
+            width: 100% !important; 
+          }
+          table.body .btn a {
+            width: 100% !important; 
+          }
+          table.body .img-responsive {
+            height: auto !important;
+            max-width: 100% !important;
+            width: auto !important; 
+          }
+        }
+
+        /* -------------------------------------
+            PRESERVE THESE STYLES IN THE HEAD
+        ------------------------------------- */
+        @media all {
+          .ExternalClass {
+            width: 100%; 
+          }
+          .ExternalClass,
+          .ExternalClass p,
+          .ExternalClass span,
+          .ExternalClass font,
+          .ExternalClass td,
+          .ExternalClass div {
+            line-height: 100%; 
+          }
+          .apple-link a {
+            color: inherit !important;
+            font-family: inherit !important;
+            font-size: inherit !important;
+            font-weight: inherit !important;
+            line-height: inherit !important;
+            text-decoration: none !important; 
+          }
+          #MessageViewBody a {
+            color: inherit;
+            text-decoration: none;
+            font-size: inherit;
+            font-family: inherit;
+            font-weight: inherit;
+            line-height: inherit;
+          }
+          .btn-primary table td:hover {
+            background-color: #34495e !important; 
+          }
+          .btn-primary a:hover {
+            background-color: #34495e !important;
+            border-color: #34495e !important; 
+          } 
+        }
+
+      </style>
+    </head>
+    <body>
+      <span class="preheader">Lembrete de Mensalidade</span>
+      <table role="presentation" border="0" cellpadding="0" cellspacing="0" class="body">
+        <tr>
+          <td>&nbsp;</td>
+          <td class="container">
+            <div class="content">
+
+              <!-- START CENTERED WHITE CONTAINER -->
+              <table role="presentation" class="main">
+
+                <!-- START MAIN CONTENT AREA -->
+                <tr>
+                  <td class="wrapper">
+                    <table role="presentation" border="0" cellpadding="0" cellspacing="0" style="background-color: #3498db;">
+                      <tr>
+                        <td style="text-align: center;"><img src="https://udv.org.br/wp-content/uploads/2016/01/centro-espirita-beneficente-uniao-do-vegetal-300x164.png" alt="UDV" style="display: block; margin: 0 auto;"></td>
+                      </tr>
+                    </table>
+                    <br>
+                    <table role="presentation" border="0" cellpadding="0" cellspacing="0">
+                      <tr>
+                        <td>
+                          <p>Olá, <b>'''
+
+_ANTES_VENCIMENTO = '''!</b></p>
+                          <p>Este é um aviso automático de cobrança emitido por <b>CEBUDV NSJB</b>, com vencimento em '''
+
+_ANTES_TABELA = '''</p>
+                          '''
+
+_ANTES_TOTAL = '<table>'
+
+_ANTES_BOLETO = '''
+                            </table>
+                          <br>
+                          <p>Fique de olho para não perder a data de vencimento!</p>
+                          <table role="presentation" border="0" cellpadding="0" cellspacing="0" class="btn btn-primary">
+                            <tbody>
+                              <tr>
+                                <td align="left">
+                                  <table role="presentation" border="0" cellpadding="0" cellspacing="0">
+                                    <tbody>
+                                      <tr>
+                                        <td> <a href="'''
+
+_DEPOIS_BOLETO = '''" target="_blank">Visualizar Boleto</a> </td>
+                                      </tr>
+                                    </tbody>
+                                  </table>
+                                </td>
+                              </tr>
+                            </tbody>
+                          </table>
+                          <table role="presentation" border="0" cellpadding="0" cellspacing="0">
+                          <tr>
+                            <td>
+                              <br>
+                              <p>Use este código de barras para pagamentos no bankline:</p>
+                              <p>''' + CODIGO_BARRAS + '''</p>
+                              <br>
+                              <p>Em caso de dúvidas entre em contato.</p>
+                              <br>
+                              <p>Atenciosamente,</p>
+                              <p><b>Tesouraria NSJB</b></p>
+                          </td></tr>
+                          </table>
+                        </td>
+                      </tr>
+                    </table>
+                  </td>
+                </tr>
+
+              <!-- END MAIN CONTENT AREA -->
+              </table>
+              <!-- END CENTERED WHITE CONTAINER -->
+
+              <!-- START FOOTER -->
+              <div class="footer">
+                <table role="presentation" border="0" cellpadding="0" cellspacing="0">
+                  <tr>
+                    <td class="content-block">
+                      <span class="apple-link">Estrada João Mineiro, 3303 Bairro São Pedro, Mairiporã SP 07613-800</span>
+                    </td>
+                  </tr>
+                  <tr>
+                    <td class="content-block powered-by">
+                      Powered by <a href="https://i.pinimg.com/originals/82/6a/97/826a97bc3c85f06999008eafa4097c0a.gif">Senhor Barriga</a>.
+                    </td>
+                  </tr>
+                </table>
+              </div>
+              <!-- END FOOTER -->
+
+            </div>
+          </td>
+          <td>&nbsp;</td>
+        </tr>
+      </table>
+    </body>
+  </html>
+  '''
+
+
+_LINHA_TOTAL = '<tr><td align="left" style="padding: 8px"><b>Valor Total:</b></td><td align="right" style="padding: 8px">{}</td></tr>'
+
+
+def linha_total(total: float) -> str:
+    return _LINHA_TOTAL.format(f'{total:.2f}')
+
+
+def _montar(nome: str, vencimento: str, tabela: str, total: str, boleto_url: str) -> str:
+    return ''.join((
+        _ANTES_NOME, nome,
+        _ANTES_VENCIMENTO, vencimento,
+        _ANTES_TABELA, tabela,
+        _ANTES_TOTAL, _LINHA_TOTAL.format(total),
+        _ANTES_BOLETO, boleto_url,
+        _DEPOIS_BOLETO,
+    ))
+
+
+def montar_html(nome: str, vencimento: str, tabela: str, total: float, boleto_url: str = BOLETO_URL_PADRAO) -> str:
+    return _montar(nome.title(), vencimento, tabela, f'{total:.2f}', boleto_url)
+
+
+def montar_texto(
+    nome: str,
+    vencimento: str,
+    descricoes: Sequence[str],
+    valores: Sequence[float],
+    total: float,
+    boleto_url: str = BOLETO_URL_PADRAO,
+) -> str:
+    # Parte text/plain do email, com o mesmo conteúdo do HTML
+    valores = [formatar_valor(valor) for valor in valores]
+    largura = max([len('Valor Total:'), len('Descrição')] + [len(str(d)) for d in descricoes])
+    largura_valor = max([len(f'{total:.2f}'), len('Valor')] + [len(v) for v in valores])
+    linhas = [f'{"Descrição":<{largura}}  {"Valor":>{largura_valor}}']
+    linhas += [f'{str(d):<{largura}}  {v:>{largura_valor}}' for d, v in zip(descricoes, valores)]
+    linhas.append(f'{"Valor Total:":<{largura}}  {f"{total:.2f}":>{largura_valor}}')
+    tabela = '\n'.join(linhas)
+    return (
+        f'Olá, {nome.title()}!\n\n'
+        f'Este é um aviso automático de cobrança emitido por CEBUDV NSJB, com vencimento em {vencimento}\n\n'
+        f'{tabela}\n\n'
+        'Fique de olho para não perder a data de vencimento!\n\n'
+        f'Visualizar Boleto: {boleto_url}\n\n'
+        'Use este código de barras para pagamentos no bankline:\n'
+        f'{CODIGO_BARRAS}\n\n'
+        'Em caso de dúvidas entre em contato.\n\n'
+        'Atenciosamente,\n'
+        'Tesouraria NSJB\n'
+    )
+
+
+def formatar_valor(valor: float) -> str:
+    return f'{valor:,.2f}'
+
+
+def formatar_tabela_despesas(df, uuid: Optional[str] = None, formato_valor: Callable = '{:,.2f}'.format) -> str:
+    # Caminho original: Styler do pandas + premailer a cada chamada
+    from premailer import transform
+
+    styler = df.style
+    if uuid is not None:
+        styler = styler.set_uuid(uuid)
+    styled_table = styler.format({
+        'Valor': formato_valor
+    }).set_table_styles(ESTILOS_TABELA).hide(axis="index").to_html()
+
+    return transform(styled_table)
+
+
+_DESCRICAO = '@@DESCRICAO{}@@'
+_VALOR = '@@VALOR{}@@'
+_NOME = '@@NOME@@'
+_VENCIMENTO = '@@VENCIMENTO@@'
+_TABELA = '@@TABELA@@'
+_TOTAL = '@@TOTAL@@'
+_BOLETO = '@@BOLETO@@'
+
+
+def _sem_documento(tabela: str) -> str:
+    # O premailer devolve a tabela dentro de um <html><head></head><body> próprio
+    m = re.fullmatch(r'\s*<html><head></head><body>(.*)</body></html>\s*', tabela, re.DOTALL)
+    return m.group(1) if m else tabela
+
+
+class TemplateEmail:
+    """Email de cobrança pré-compilado.
+
+    A tabela de lançamentos passa uma única vez pelo Styler e pelo premailer,
+    com marcadores no lugar dos dados; cada sócio é renderizado apenas
+    preenchendo as linhas e os trechos variáveis do HTML. Com ``otimizar``, o
+    HTML compilado também passa uma única vez pelo html_optimizer (CSS não
+    usado, atributos do Styler e espaços removidos).
+    """
+
+    def __init__(self, uuid: str = 'descritivo', boleto_url: str = BOLETO_URL_PADRAO, otimizar: bool = True):
+        import pandas as pd
+
+        self.uuid = uuid
+        self.boleto_url = boleto_url
+        self.otimizar = otimizar
+
+        prototipo = pd.DataFrame({
+            'Descrição': [_DESCRICAO.format(0), _DESCRICAO.format(1)],
+            'Valor': [_VALOR.format(0), _VALOR.format(1)],
+        })
+        tabela = formatar_tabela_despesas(prototipo, uuid=uuid, formato_valor=str)
+
+        # Email completo com marcadores, otimizado de uma vez, e separado nos
+        # trechos estáticos entre as partes variáveis
+        documento = _montar(_NOME, _VENCIMENTO, _TABELA + self._preparar(tabela) + _TABELA, _TOTAL, _BOLETO)
+        if otimizar:
+            documento = otimizar_html(documento)
+        antes_tabela, tabela, depois_tabela = documento.split(_TABELA)
+        self._antes_nome, antes_vencimento = antes_tabela.split(_NOME)
+        self._antes_vencimento, self._antes_tabela = antes_vencimento.split(_VENCIMENTO)
+        self._antes_total, depois_total = depois_tabela.split(_TOTAL)
+        self._antes_boleto, self._depois_boleto = depois_total.split(_BOLETO)
+
+        # Separa o HTML já inlinado em cabeçalho, linha modelo e rodapé
+        inicio = [tabela.rindex('<tr', 0, tabela.index(_DESCRICAO.format(i))) for i in (0, 1)]
+        fim = [tabela.index('</tr>', tabela.index(_VALOR.format(i))) + len('</tr>') for i in (0, 1)]
+        self._inicio_tabela = tabela[:inicio[0]]
+        self._entre_linhas = tabela[fim[0]:inicio[1]]
+        self._fim_tabela = tabela[fim[1]:]
+
+        linha = tabela[inicio[0]:fim[0]].replace('{', '{{').replace('}', '}}')
+        linha = linha.replace(_DESCRICAO.format(0), '{descricao}').replace(_VALOR.format(0), '{valor}')
+        self._linha = linha.replace('row0', 'row{i}')
+
+    def _preparar(self, tabela: str) -> str:
+        return otimizar_html(_sem_documento(tabela)) if self.otimizar else tabela
+
+    def tabela(self, descricoes: Sequence[str], valores: Sequence[float]) -> str:
+        # Descrições com '<' são interpretadas como tags pelo premailer; nesse
+        # caso raro usa o caminho original para manter o mesmo HTML
+        if any('<' in str(descricao) for descricao in descricoes):
+            import pandas as pd
+            df = pd.DataFrame({'Descrição': list(descricoes), 'Valor': list(valores)})
+            return self._preparar(formatar_tabela_despesas(df, uuid=self.uuid))
+
+        linhas = [
+            self._linha.format(i=i, descricao=html.escape(str(descricao), quote=False), valor=formatar_valor(valor))
+            for i, (descricao, valor) in enumerate(zip(descricoes, valores))
+        ]
+        return self._inicio_tabela + self._entre_linhas.join(linhas) + self._fim_tabela
+
+    def render(
+        self,
+        nome: str,
+        vencimento: str,
+        descricoes: Sequence[str],
+        valores: Sequence[float],
+        total: float,
+        boleto_url: Optional[str] = None,
+    ) -> str:
+        return ''.join((
+            self._antes_nome, nome.title(),
+            self._antes_vencimento, vencimento,
+            self._antes_tabela, self.tabela(descricoes, valores),
+            self._antes_total, f'{total:.2f}',
+            self._antes_boleto, boleto_url or self.boleto_url,
+            self._depois_boleto,
+        ))
+
+    def texto(
+        self,
+        nome: str,
+        vencimento: str,
+        descricoes: Sequence[str],
+        valores: Sequence[float],
+        total: float,
+        boleto_url: Optional[str] = None,
+    ) -> str:
+        return montar_texto(nome, vencimento, descricoes, valores, total, boleto_url or self.boleto_url)
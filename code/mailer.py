@@ -0,0 +1,312 @@
+import asyncio
+import ipaddress
+import smtplib
+import time
+from dataclasses import dataclass
+from email import charset
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Iterable, List, Optional
+
+import metrics
+
+# Quoted-printable em vez de base64: o HTML é quase todo ASCII, e o base64
+# aumentaria cada mensagem em um terço
+_UTF8_QP = charset.Charset('utf-8')
+_UTF8_QP.body_encoding = charset.QP
+
+
+@dataclass
+class Mensagem:
+    destinatario: str
+    assunto: str
+    html: str
+    texto: Optional[str] = None
+
+
+@dataclass
+class ResultadoEnvio:
+    destinatario: str
+    enviado: bool
+    tentativas: int
+    erro: Optional[str] = None
+    codigo: Optional[int] = None
+    # Bytes da mensagem MIME transmitida (só nos envios bem-sucedidos)
+    tamanho: Optional[int] = None
+
+    @property
+    def temporario(self) -> bool:
+        # Falhas de conexão e respostas 4xx ("try later") valem nova tentativa
+        return not self.enviado and (self.codigo is None or 400 <= self.codigo < 500)
+
+
+def montar_mensagem(remetente: str, mensagem: Mensagem) -> MIMEMultipart:
+    # Com a versão em texto, multipart/alternative: o cliente mostra a última
+    # parte que souber exibir, então o HTML vai por último
+    msg = MIMEMultipart('alternative') if mensagem.texto is not None else MIMEMultipart()
+    msg['From'] = remetente
+    msg['To'] = mensagem.destinatario
+    msg['Subject'] = mensagem.assunto
+
+    if mensagem.texto is not None:
+        msg.attach(MIMEText(mensagem.texto, 'plain', _UTF8_QP))
+
+    # Anexa o conteúdo HTML ao email
+    msg.attach(MIMEText(mensagem.html, 'html', _UTF8_QP))
+
+    return msg
+
+
+def _local(servidor: str) -> bool:
+    if servidor == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(servidor).is_loopback
+    except ValueError:
+        return False
+
+
+class SessaoSMTP:
+    """Conexão SMTP autenticada reutilizada entre vários envios.
+
+    Abre a conexão (STARTTLS + login) apenas no primeiro envio e reconecta
+    automaticamente quando o servidor derruba a sessão. Sem STARTTLS a
+    conexão é recusada, para a senha nunca trafegar em texto puro; só um
+    servidor local (``sem_tls_local``, ex.: o smtp-local de teste) dispensa.
+    """
+
+    def __init__(self, servidor: str, porta, usuario: str, senha: str, timeout: float = 30.0, sem_tls_local: bool = False):
+        self.servidor = servidor
+        self.porta = int(porta)
+        self.usuario = usuario
+        self.senha = senha
+        self.timeout = timeout
+        self.sem_tls_local = sem_tls_local
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def conectar(self) -> None:
+        self.fechar()
+        smtp = smtplib.SMTP(self.servidor, self.porta, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if smtp.has_extn('starttls'):
+                smtp.starttls()
+                smtp.ehlo()
+            elif not (self.sem_tls_local and _local(self.servidor)):
+                raise smtplib.SMTPNotSupportedError(f'{self.servidor}:{self.porta} não oferece STARTTLS; envio cancelado')
+            if self.usuario:
+                smtp.login(self.usuario, self.senha)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+
+    def abrir(self) -> 'SessaoSMTP':
+        # Conecta antes do primeiro envio: servidor sem STARTTLS encerra o envio
+        # todo de uma vez; as demais falhas de conexão ficam como falha de cada mensagem
+        try:
+            self.conectar()
+        except smtplib.SMTPNotSupportedError:
+            raise
+        except (smtplib.SMTPException, OSError):
+            self._smtp = None
+        return self
+
+    def fechar(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except smtplib.SMTPException:
+            pass
+        except OSError:
+            pass
+        finally:
+            self._smtp.close()
+            self._smtp = None
+
+    def _ativa(self) -> bool:
+        if self._smtp is None:
+            return False
+        try:
+            return self._smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def enviar(self, mensagem: Mensagem, tentativas: int = 3) -> ResultadoEnvio:
+        msg = montar_mensagem(self.usuario, mensagem).as_string()
+
+        erro = None
+        codigo = None
+        for tentativa in range(1, tentativas + 1):
+            permanente = False
+            try:
+                inicio = time.perf_counter()
+                if self._smtp is None:
+                    self.conectar()
+                self._smtp.sendmail(self.usuario, mensagem.destinatario, msg)
+                metrics.registrar('smtp', segundos=time.perf_counter() - inicio, enviado=True, tentativa=tentativa, bytes=len(msg))
+                return ResultadoEnvio(mensagem.destinatario, True, tentativa, tamanho=len(msg))
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError) as e:
+                # Servidor derrubou a sessão: reconecta na próxima tentativa
+                erro = f'{type(e).__name__}: {e}'
+                codigo = None
+                self._smtp = None
+            except smtplib.SMTPResponseException as e:
+                erro = f'{e.smtp_code} {e.smtp_error!r}'
+                codigo = e.smtp_code
+                # Erros permanentes (5xx) não adianta tentar de novo
+                permanente = e.smtp_code >= 500
+                # Erros 4xx podem ter deixado a sessão num estado ruim
+                if not permanente and not self._ativa():
+                    self._smtp = None
+            except smtplib.SMTPRecipientsRefused as e:
+                erro = f'Destinatário recusado: {e.recipients}'
+                codigo = next(iter(e.recipients.values()))[0]
+                permanente = codigo >= 500
+            except (smtplib.SMTPException, OSError) as e:
+                # DNS, TLS, autenticação ou outra falha de conexão: conta como tentativa falha
+                erro = f'{type(e).__name__}: {e}'
+                codigo = None
+                permanente = isinstance(e, smtplib.SMTPNotSupportedError)
+                self.fechar()
+            metrics.registrar('smtp', segundos=time.perf_counter() - inicio, enviado=False, tentativa=tentativa, codigo=codigo)
+            if permanente:
+                break
+            if tentativa < tentativas:
+                time.sleep(min(2 ** (tentativa - 1), 30))
+
+        return ResultadoEnvio(mensagem.destinatario, False, tentativa, erro, codigo)
+
+    def __enter__(self) -> 'SessaoSMTP':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+
+def enviar_lote(
+    mensagens: Iterable[Mensagem],
+    servidor: str,
+    porta,
+    usuario: str,
+    senha: str,
+    tentativas: int = 3,
+    sem_tls_local: bool = False,
+) -> List[ResultadoEnvio]:
+    # Envia todas as mensagens usando uma única sessão autenticada
+    resultados = []
+    with SessaoSMTP(servidor, porta, usuario, senha, sem_tls_local=sem_tls_local).abrir() as sessao:
+        for mensagem in mensagens:
+            resultados.append(sessao.enviar(mensagem, tentativas=tentativas))
+    return resultados
+
+
+class TokenBucket:
+    """Limite de envio por segundo e por hora, com redução adaptativa.
+
+    A taxa por segundo é multiplicada por ``fator``, que cai pela metade a
+    cada resposta 4xx do servidor e volta a subir aos poucos a cada sucesso.
+    """
+
+    def __init__(self, por_segundo: float, por_hora: Optional[float] = None, fator_minimo: float = 0.05):
+        self.por_segundo = float(por_segundo)
+        self.por_hora = float(por_hora) if por_hora else None
+        self.fator = 1.0
+        self.fator_minimo = fator_minimo
+        self._fichas_segundo = max(1.0, self.por_segundo)
+        self._fichas_hora = self.por_hora
+        self._ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _reabastecer(self) -> None:
+        agora = time.monotonic()
+        decorrido = agora - self._ultimo
+        self._ultimo = agora
+        taxa = self.por_segundo * self.fator
+        self._fichas_segundo = min(max(1.0, taxa), self._fichas_segundo + decorrido * taxa)
+        if self.por_hora is not None:
+            self._fichas_hora = min(self.por_hora, self._fichas_hora + decorrido * self.por_hora / 3600)
+
+    def _espera(self) -> float:
+        espera = 0.0
+        if self._fichas_segundo < 1:
+            espera = (1 - self._fichas_segundo) / (self.por_segundo * self.fator)
+        if self.por_hora is not None and self._fichas_hora < 1:
+            espera = max(espera, (1 - self._fichas_hora) * 3600 / self.por_hora)
+        return espera
+
+    async def adquirir(self) -> None:
+        async with self._lock:
+            while True:
+                self._reabastecer()
+                espera = self._espera()
+                if espera == 0:
+                    self._fichas_segundo -= 1
+                    if self.por_hora is not None:
+                        self._fichas_hora -= 1
+                    return
+                await asyncio.sleep(espera)
+
+    def reduzir(self) -> None:
+        self.fator = max(self.fator_minimo, self.fator / 2)
+
+    def recuperar(self) -> None:
+        self.fator = min(1.0, self.fator + 0.05)
+
+
+async def enviar_async(
+    mensagens: Iterable[Mensagem],
+    servidor: str,
+    porta,
+    usuario: str,
+    senha: str,
+    sessoes: int = 4,
+    por_segundo: float = 5.0,
+    por_hora: Optional[float] = None,
+    tentativas: int = 3,
+    espera_inicial: float = 1.0,
+    sem_tls_local: bool = False,
+) -> List[ResultadoEnvio]:
+    # Mantém ``sessoes`` conexões SMTP ocupadas ao mesmo tempo, respeitando o limite
+    mensagens = list(mensagens)
+    resultados: List[Optional[ResultadoEnvio]] = [None] * len(mensagens)
+    limite = TokenBucket(por_segundo, por_hora)
+
+    # Servidor sem STARTTLS encerra o envio aqui, antes de qualquer sessão começar a enviar
+    verificacao = SessaoSMTP(servidor, porta, usuario, senha, sem_tls_local=sem_tls_local)
+    await asyncio.to_thread(verificacao.abrir)
+    await asyncio.to_thread(verificacao.fechar)
+
+    fila: asyncio.Queue = asyncio.Queue()
+    for i, mensagem in enumerate(mensagens):
+        fila.put_nowait((i, mensagem, 1))
+
+    async def trabalhador() -> None:
+        sessao = SessaoSMTP(servidor, porta, usuario, senha, sem_tls_local=sem_tls_local)
+        try:
+            while True:
+                try:
+                    i, mensagem, tentativa = fila.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                await limite.adquirir()
+                # smtplib é bloqueante: cada sessão roda na sua própria thread
+                resultado = await asyncio.to_thread(sessao.enviar, mensagem, 1)
+                resultado.tentativas = tentativa
+
+                if resultado.enviado:
+                    limite.recuperar()
+                elif resultado.temporario and tentativa < tentativas:
+                    limite.reduzir()
+                    await asyncio.sleep(espera_inicial * 2 ** (tentativa - 1))
+                    fila.put_nowait((i, mensagem, tentativa + 1))
+                    continue
+
+                resultados[i] = resultado
+        finally:
+            await asyncio.to_thread(sessao.fechar)
+
+    await asyncio.gather(*(trabalhador() for _ in range(max(1, min(sessoes, len(mensagens))))))
+    return resultados
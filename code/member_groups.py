@@ -0,0 +1,77 @@
+from array import array
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class ExtratoSocio:
+    """Descritivo de um sócio: dados do email e os lançamentos (descrição, valor).
+
+    Valores guardados em centavos inteiros num ``array('q')`` e ``__slots__``
+    sem ``__dict__``, para milhares de sócios ocuparem pouca memória.
+    """
+
+    __slots__ = ('nome', 'email', 'vencimento', 'descricoes', 'centavos')
+
+    def __init__(self, nome: str, email: str, vencimento: str, descricoes: Tuple[str, ...], centavos: array):
+        self.nome = nome
+        self.email = email
+        self.vencimento = vencimento
+        self.descricoes = descricoes
+        self.centavos = centavos
+
+    @property
+    def valores(self) -> List[float]:
+        return [c / 100 for c in self.centavos]
+
+    @property
+    def total_centavos(self) -> int:
+        return sum(self.centavos)
+
+    @property
+    def total(self) -> float:
+        return self.total_centavos / 100
+
+    def __len__(self) -> int:
+        return len(self.centavos)
+
+    def __repr__(self) -> str:
+        return f'ExtratoSocio({self.nome!r}, {len(self)} lançamentos, R$ {self.total:.2f})'
+
+    def __reduce__(self):
+        # Enviado aos processos de renderização (render_pool)
+        return ExtratoSocio, (self.nome, self.email, self.vencimento, self.descricoes, self.centavos)
+
+
+def agrupar_socios(df: pd.DataFrame) -> List[ExtratoSocio]:
+    # Agrupa os lançamentos por sócio numa única passada: fatoriza os nomes,
+    # ordena uma vez (ordenação estável, preservando a ordem dos lançamentos)
+    # e recorta cada sócio pelos offsets, sem filtrar o DataFrame por sócio
+    codigos, nomes = pd.factorize(df['Nome'])
+    validos = codigos >= 0
+    ordem = np.argsort(codigos[validos], kind='stable')
+    if not validos.all():
+        ordem = np.flatnonzero(validos)[ordem]
+
+    contagens = np.bincount(codigos[validos], minlength=len(nomes))
+    offsets = np.concatenate(([0], np.cumsum(contagens)))
+
+    descricoes = df['Descrição'].to_numpy()[ordem].tolist()
+    # Valores em centavos convertidos de uma vez, como bytes prontos para o array('q');
+    # Valor vazio conta como zero, como na soma do pandas (NaN viraria o menor int64)
+    centavos = np.rint(df['Valor'].fillna(0).to_numpy(dtype=np.float64)[ordem] * 100).astype(np.int64).tobytes()
+    primeiros = ordem[offsets[:-1]]
+    emails = df['Email'].to_numpy()[primeiros]
+    vencimentos = df['Vencimento'].to_numpy()[primeiros]
+
+    return [
+        ExtratoSocio(
+            nome,
+            emails[i],
+            vencimentos[i],
+            tuple(descricoes[offsets[i]:offsets[i + 1]]),
+            array('q', centavos[offsets[i] * 8:offsets[i + 1] * 8]),
+        )
+        for i, nome in enumerate(nomes)
+    ]
@@ -0,0 +1,219 @@
+import atexit
+import functools
+import json
+import os
+import glob
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+# Caminho do relatório JSON; vazio = instrumentação desligada
+CAMINHO_RELATORIO = os.environ.get('BOLETOS_METRICAS', '')
+
+ATIVO = bool(CAMINHO_RELATORIO)
+
+_eventos: list = []
+_inicio = time.perf_counter()
+
+# Intervalo entre leituras da memória enquanto há alguma etapa em andamento
+INTERVALO_AMOSTRA = 0.01
+_PAGINA_MB = os.sysconf('SC_PAGE_SIZE') / 1024 / 1024 if hasattr(os, 'sysconf') else 0.0
+
+# Pico de memória de cada etapa em andamento, atualizado pelo amostrador
+_abertas: list = []
+_trava = threading.Lock()
+_amostrador: Optional[threading.Thread] = None
+
+
+def ativar(caminho_relatorio: Optional[str] = None) -> None:
+    # Liga a coleta; se um caminho for informado, o relatório é gravado na saída
+    global ATIVO, CAMINHO_RELATORIO
+    ATIVO = True
+    if caminho_relatorio:
+        CAMINHO_RELATORIO = caminho_relatorio
+
+
+def desativar() -> None:
+    global ATIVO
+    ATIVO = False
+
+
+def _pico_memoria_processo_mb() -> Optional[float]:
+    # Maior RSS do processo desde o início (ru_maxrss vem em KB no Linux);
+    # None no Windows, que não tem o módulo resource
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _rss_mb() -> Optional[float]:
+    # RSS atual do processo mais o dos processos filhos (pools de renderização
+    # e de leitura), lido do /proc; None onde não há /proc
+    try:
+        pids = [os.getpid()]
+        for arquivo in glob.glob(f'/proc/{os.getpid()}/task/*/children'):
+            with open(arquivo) as f:
+                pids += [int(pid) for pid in f.read().split()]
+        total = 0
+        for pid in pids:
+            try:
+                with open(f'/proc/{pid}/statm') as f:
+                    total += int(f.read().split()[1])
+            except (OSError, IndexError, ValueError):
+                # Filho que terminou entre a listagem e a leitura
+                continue
+        return total * _PAGINA_MB
+    except OSError:
+        return None
+
+
+def _atualizar_picos() -> None:
+    rss = _rss_mb()
+    if rss is None:
+        return
+    with _trava:
+        for medida in _abertas:
+            medida['pico'] = max(medida['pico'] or 0.0, rss)
+
+
+def _amostrar() -> None:
+    global _amostrador
+    while True:
+        with _trava:
+            if not _abertas:
+                _amostrador = None
+                return
+        _atualizar_picos()
+        time.sleep(INTERVALO_AMOSTRA)
+
+
+def _abrir_medida() -> dict:
+    global _amostrador
+    medida = {'pico': _rss_mb()}
+    with _trava:
+        _abertas.append(medida)
+        if _amostrador is None:
+            _amostrador = threading.Thread(target=_amostrar, name='metricas-memoria', daemon=True)
+            _amostrador.start()
+    return medida
+
+
+def _fechar_medida(medida: dict) -> Optional[float]:
+    _atualizar_picos()
+    with _trava:
+        # Pela identidade: etapas aninhadas podem ter medidas iguais
+        del _abertas[next(i for i, aberta in enumerate(_abertas) if aberta is medida)]
+    return medida['pico']
+
+
+def _linhas(objeto) -> Optional[int]:
+    if isinstance(objeto, (str, bytes)) or not hasattr(objeto, '__len__'):
+        return None
+    return len(objeto)
+
+
+def registrar(tipo: str, **valores) -> None:
+    if ATIVO:
+        _eventos.append({'tipo': tipo, 't': time.perf_counter() - _inicio, **valores})
+
+
+def etapa(nome: str):
+    # Decorador: mede tempo, linhas de entrada/saída e pico de memória da chamada
+    # (maior RSS do processo e dos filhos amostrado durante a etapa).
+    # Desligado, custa só a verificação de ATIVO.
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            if not ATIVO:
+                return funcao(*args, **kwargs)
+            inicio = time.perf_counter()
+            medida = _abrir_medida()
+            try:
+                resultado = funcao(*args, **kwargs)
+            finally:
+                pico = _fechar_medida(medida)
+            registrar(
+                'etapa',
+                nome=nome,
+                segundos=time.perf_counter() - inicio,
+                linhas_entrada=_linhas(args[0]) if args else None,
+                linhas_saida=_linhas(resultado),
+                pico_memoria_mb=pico,
+            )
+            return resultado
+        return medida
+    return decorador
+
+
+def _percentil(valores: list, p: float) -> Optional[float]:
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+def relatorio() -> dict:
+    etapas = {}
+    for evento in _eventos:
+        if evento['tipo'] != 'etapa':
+            continue
+        resumo = etapas.setdefault(evento['nome'], {'chamadas': 0, 'segundos': 0.0, 'linhas_entrada': 0, 'linhas_saida': 0, 'pico_memoria_mb': None})
+        resumo['chamadas'] += 1
+        if evento['pico_memoria_mb'] is not None:
+            resumo['pico_memoria_mb'] = max(resumo['pico_memoria_mb'] or 0.0, evento['pico_memoria_mb'])
+        resumo['segundos'] += evento['segundos']
+        resumo['linhas_entrada'] += evento['linhas_entrada'] or 0
+        resumo['linhas_saida'] += evento['linhas_saida'] or 0
+
+    arquivos = [e for e in _eventos if e['tipo'] == 'arquivo']
+    smtp = [e for e in _eventos if e['tipo'] == 'smtp']
+    latencias = [e['segundos'] for e in smtp]
+    enviados = [e['bytes'] for e in smtp if e.get('bytes')]
+    emails = [e for e in _eventos if e['tipo'] == 'email']
+
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'duracao_segundos': time.perf_counter() - _inicio,
+        # Só do processo principal e desde o início: o de cada etapa fica em 'etapas'
+        'pico_memoria_processo_mb': _pico_memoria_processo_mb(),
+        'etapas': etapas,
+        'arquivos': {
+            'quantidade': len(arquivos),
+            'bytes': sum(e['bytes'] for e in arquivos),
+        },
+        'smtp': {
+            'tentativas': len(smtp),
+            'enviadas': sum(e['enviado'] for e in smtp),
+            'latencia_p50': _percentil(latencias, 50),
+            'latencia_p95': _percentil(latencias, 95),
+            'latencia_p99': _percentil(latencias, 99),
+            'latencia_max': max(latencias, default=None),
+            'bytes': sum(enviados),
+            'bytes_por_mensagem': sum(enviados) / len(enviados) if enviados else None,
+        },
+        'emails': {
+            'quantidade': len(emails),
+            'bytes_html_medio': sum(e['bytes_html'] for e in emails) / len(emails) if emails else None,
+            'bytes_texto_medio': sum(e['bytes_texto'] for e in emails) / len(emails) if emails else None,
+            'bytes_html_max': max((e['bytes_html'] for e in emails), default=None),
+            'acima_do_limite': sum(e['acima_do_limite'] for e in emails),
+        },
+        'eventos': _eventos,
+    }
+
+
+def salvar_relatorio(caminho: Optional[str] = None) -> None:
+    caminho = caminho or CAMINHO_RELATORIO
+    if not caminho or not _eventos:
+        return
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio(), f, ensure_ascii=False, indent=2, default=str)
+
+
+@atexit.register
+def _ao_sair() -> None:
+    if ATIVO:
+        salvar_relatorio()
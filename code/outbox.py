@@ -0,0 +1,137 @@
+import os
+import sqlite3
+from datetime import datetime
+from typing import Iterable, List, Set, Tuple
+
+from mailer import Mensagem, ResultadoEnvio, SessaoSMTP
+
+# Caixa de saída persistente: sobrevive a uma execução interrompida
+CAMINHO_OUTBOX = os.environ.get('BOLETOS_OUTBOX', '../outbox/caixa_saida.sqlite')
+
+PENDENTE = 'pendente'
+ENVIADO = 'enviado'
+FALHOU = 'falhou'
+# Não será enviada (ex.: o sócio pagou o boleto depois de a mensagem ser enfileirada)
+CANCELADO = 'cancelado'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS mensagens (
+    id INTEGER PRIMARY KEY,
+    lote TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    destinatario TEXT NOT NULL,
+    assunto TEXT NOT NULL,
+    html TEXT NOT NULL,
+    texto TEXT,
+    estado TEXT NOT NULL DEFAULT 'pendente',
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    codigo INTEGER,
+    erro TEXT,
+    atualizado_em TEXT NOT NULL,
+    UNIQUE (lote, chave)
+);
+CREATE INDEX IF NOT EXISTS mensagens_estado ON mensagens (lote, estado);
+"""
+
+
+class CaixaSaida:
+    """Mensagens renderizadas e o estado de envio de cada uma, em SQLite.
+
+    Cada mensagem é identificada por (lote, chave); enfileirar de novo a mesma
+    chave não faz nada, e drenar só envia o que ainda não foi enviado.
+    """
+
+    def __init__(self, caminho: str = CAMINHO_OUTBOX):
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.executescript(_ESQUEMA)
+        # Caixas criadas antes da parte em texto do email
+        colunas = {coluna for _, coluna, *_ in self.conexao.execute('PRAGMA table_info(mensagens)')}
+        if 'texto' not in colunas:
+            self.conexao.execute('ALTER TABLE mensagens ADD COLUMN texto TEXT')
+
+    def fechar(self) -> None:
+        self.conexao.close()
+
+    def __enter__(self) -> 'CaixaSaida':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+    def chaves(self, lote: str) -> Set[str]:
+        # Chaves já enfileiradas, para não renderizar de novo ao retomar
+        return {chave for chave, in self.conexao.execute('SELECT chave FROM mensagens WHERE lote = ?', (lote,))}
+
+    def enfileirar(self, lote: str, mensagens: Iterable[Tuple[str, Mensagem]]) -> int:
+        agora = datetime.now().isoformat(timespec='seconds')
+        with self.conexao:
+            cursor = self.conexao.executemany(
+                'INSERT OR IGNORE INTO mensagens (lote, chave, destinatario, assunto, html, texto, atualizado_em) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((lote, chave, m.destinatario, m.assunto, m.html, m.texto, agora) for chave, m in mensagens),
+            )
+        return cursor.rowcount
+
+    def pendentes(self, lote: str, max_tentativas: int = 3) -> List[Tuple[int, Mensagem, int]]:
+        # Ainda não enviadas ou com falha temporária (conexão/4xx) abaixo do limite
+        linhas = self.conexao.execute(
+            """
+            SELECT id, destinatario, assunto, html, texto, tentativas FROM mensagens
+            WHERE lote = ? AND (
+                estado = ? OR (estado = ? AND tentativas < ? AND (codigo IS NULL OR codigo BETWEEN 400 AND 499))
+            )
+            ORDER BY id
+            """,
+            (lote, PENDENTE, FALHOU, max_tentativas),
+        )
+        return [
+            (id_, Mensagem(destinatario, assunto, html, texto), tentativas)
+            for id_, destinatario, assunto, html, texto, tentativas in linhas
+        ]
+
+    def marcar(self, id_: int, resultado: ResultadoEnvio) -> None:
+        # Grava o resultado de cada envio na hora, para uma queda perder no máximo uma mensagem
+        with self.conexao:
+            self.conexao.execute(
+                'UPDATE mensagens SET estado = ?, tentativas = tentativas + ?, codigo = ?, erro = ?, atualizado_em = ? WHERE id = ?',
+                (
+                    ENVIADO if resultado.enviado else FALHOU,
+                    resultado.tentativas,
+                    resultado.codigo,
+                    resultado.erro,
+                    datetime.now().isoformat(timespec='seconds'),
+                    id_,
+                ),
+            )
+
+    def drenar(
+        self, lote: str, servidor: str, porta, usuario: str, senha: str, max_tentativas: int = 3, sem_tls_local: bool = False,
+    ) -> List[ResultadoEnvio]:
+        # Envia as pendentes numa única sessão SMTP; pode ser chamado de novo sem reenviar nada
+        resultados = []
+        pendentes = self.pendentes(lote, max_tentativas)
+        if not pendentes:
+            return resultados
+        with SessaoSMTP(servidor, porta, usuario, senha, sem_tls_local=sem_tls_local).abrir() as sessao:
+            for id_, mensagem, tentativas in pendentes:
+                resultado = sessao.enviar(mensagem, tentativas=max_tentativas - tentativas)
+                self.marcar(id_, resultado)
+                resultados.append(resultado)
+        return resultados
+
+    def cancelar(self, lote: str, chaves: Iterable[str]) -> int:
+        # Só mensagens ainda não enviadas; as enviadas ficam como estão
+        agora = datetime.now().isoformat(timespec='seconds')
+        with self.conexao:
+            cursor = self.conexao.executemany(
+                'UPDATE mensagens SET estado = ?, atualizado_em = ? WHERE lote = ? AND chave = ? AND estado IN (?, ?)',
+                ((CANCELADO, agora, lote, chave, PENDENTE, FALHOU) for chave in chaves),
+            )
+        return cursor.rowcount
+
+    def resumo(self, lote: str) -> dict:
+        contagem = dict(self.conexao.execute('SELECT estado, COUNT(*) FROM mensagens WHERE lote = ? GROUP BY estado', (lote,)))
+        return {estado: contagem.get(estado, 0) for estado in (PENDENTE, ENVIADO, FALHOU, CANCELADO)}
@@ -0,0 +1,218 @@
+import glob
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import cache
+import metrics
+
+# Impressão digital das entradas da última execução bem-sucedida de cada etapa
+CAMINHO_ESTADO = '../pipeline/estado.json'
+
+EXECUTADA = 'executada'
+PULADA = 'pulada'
+FALHOU = 'falhou'
+BLOQUEADA = 'bloqueada'
+
+
+@dataclass
+class Etapa:
+    """Etapa do pipeline com entradas e saídas declaradas (aceitam curingas).
+
+    É pulada quando o conteúdo das entradas não mudou desde a última execução e
+    todas as saídas existem. Sem entradas declaradas, roda sempre.
+    """
+
+    nome: str
+    funcao: Callable[[], None]
+    entradas: List[str] = field(default_factory=list)
+    saidas: List[str] = field(default_factory=list)
+    depende: List[str] = field(default_factory=list)
+    contexto: str = ''
+
+
+def _arquivos(padroes: List[str]) -> List[str]:
+    arquivos = []
+    for padrao in padroes:
+        encontrados = sorted(glob.glob(padrao))
+        if not encontrados:
+            raise FileNotFoundError(f'Entrada não encontrada: {padrao}')
+        arquivos.extend(encontrados)
+    return arquivos
+
+
+def impressao_digital(etapa: Etapa) -> Optional[str]:
+    if not etapa.entradas:
+        return None
+    arquivos = _arquivos(etapa.entradas)
+    return cache.chave(*arquivos, contexto=f'{etapa.nome}:{etapa.contexto}:{"|".join(arquivos)}')
+
+
+def _ordenar(etapas: List[Etapa]) -> List[Etapa]:
+    # Ordem topológica; falha em dependência desconhecida ou ciclo
+    por_nome = {etapa.nome: etapa for etapa in etapas}
+    ordem, visitando, visitadas = [], set(), set()
+
+    def visitar(nome: str) -> None:
+        if nome in visitadas:
+            return
+        if nome in visitando:
+            raise ValueError(f'Ciclo no pipeline envolvendo a etapa {nome}')
+        if nome not in por_nome:
+            raise ValueError(f'Etapa desconhecida: {nome}')
+        visitando.add(nome)
+        for dependencia in por_nome[nome].depende:
+            visitar(dependencia)
+        visitando.discard(nome)
+        visitadas.add(nome)
+        ordem.append(por_nome[nome])
+
+    for etapa in etapas:
+        visitar(etapa.nome)
+    return ordem
+
+
+def _ler_estado(caminho: str) -> Dict[str, str]:
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _gravar_estado(caminho: str, estado: Dict[str, str]) -> None:
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2)
+    os.replace(temporario, caminho)
+
+
+def executar_pipeline(
+    etapas: List[Etapa],
+    paralelo: bool = True,
+    forcar: bool = False,
+    caminho_estado: str = CAMINHO_ESTADO,
+) -> Dict[str, str]:
+    # Roda cada etapa assim que as dependências terminam; etapas independentes
+    # rodam ao mesmo tempo (em threads: o trabalho pesado já usa processos ou libera o GIL)
+    ordem = _ordenar(etapas)
+    estado = _ler_estado(caminho_estado)
+    situacao: Dict[str, str] = {}
+    digitais: Dict[str, Optional[str]] = {}
+    erros: Dict[str, BaseException] = {}
+
+    with ThreadPoolExecutor(max_workers=len(ordem) if paralelo else 1) as executor:
+        rodando = {}
+        while len(situacao) < len(ordem):
+            for etapa in ordem:
+                if etapa.nome in situacao or etapa.nome in rodando.values():
+                    continue
+                dependencias = [situacao.get(d) for d in etapa.depende]
+                if any(s in (FALHOU, BLOQUEADA) for s in dependencias):
+                    situacao[etapa.nome] = BLOQUEADA
+                    continue
+                if not all(s in (EXECUTADA, PULADA) for s in dependencias):
+                    continue
+
+                # As entradas só são lidas agora, depois das etapas anteriores gravarem as saídas
+                try:
+                    digital = impressao_digital(etapa)
+                except OSError as e:
+                    # Entrada ausente ou ilegível: falha só esta etapa (e bloqueia as dependentes)
+                    situacao[etapa.nome] = FALHOU
+                    erros[etapa.nome] = e
+                    print(f'[{etapa.nome}] falhou: {e}')
+                    continue
+                atualizada = digital is not None and estado.get(etapa.nome) == digital
+                if not forcar and atualizada and all(glob.glob(saida) for saida in etapa.saidas):
+                    situacao[etapa.nome] = PULADA
+                    print(f'[{etapa.nome}] entradas sem alteração, etapa pulada')
+                    continue
+                digitais[etapa.nome] = digital
+                print(f'[{etapa.nome}] executando')
+                rodando[executor.submit(etapa.funcao)] = etapa.nome
+
+            if not rodando:
+                # Em ordem topológica, uma passada sem nada rodando resolve todas as etapas
+                continue
+            concluidas, _ = wait(rodando, return_when=FIRST_COMPLETED)
+            for futuro in concluidas:
+                nome = rodando.pop(futuro)
+                if futuro.exception() is not None:
+                    situacao[nome] = FALHOU
+                    erros[nome] = futuro.exception()
+                    print(f'[{nome}] falhou: {futuro.exception()}')
+                    continue
+                situacao[nome] = EXECUTADA
+                metrics.registrar('pipeline', etapa=nome)
+                if digitais[nome] is not None:
+                    estado[nome] = digitais[nome]
+                    _gravar_estado(caminho_estado, estado)
+
+    for nome in (etapa.nome for etapa in ordem):
+        print(f'{nome:>12}: {situacao[nome]}')
+    if erros:
+        nome, erro = next(iter(erros.items()))
+        raise RuntimeError(f'A etapa {nome} falhou') from erro
+    return situacao
+
+
+def etapas_padrao(args, incluir_socios: bool = True) -> List[Etapa]:
+    # socios -> lancamentos -> (boletos || emails) -> envio; sem a etapa de sócios
+    # quando a lista é atualizada por fora (ex.: vigia de pastas)
+    import generate_boleto
+    import generate_client_list
+    import ledger
+    import reconciliation
+    import send_mail
+    from exporters import EXTENSOES
+    from outbox import CAMINHO_OUTBOX, CaixaSaida
+
+    lancamentos = f'../update/{args.arquivo}'
+    lista = generate_client_list.CAMINHO_SOCIOS
+
+    def emails() -> None:
+        df = send_mail.gerar_tabela_completa(args.arquivo)
+        _, grupos = send_mail.selecionar_grupos(df)
+        pagos = reconciliation.quitados(grupos) if args.pular_pagos else set()
+        with CaixaSaida() as caixa:
+            caixa.cancelar(args.arquivo, pagos)
+            send_mail.enfileirar_mailing(caixa, args.arquivo, [g for g in grupos if g.nome not in pagos], args.processos)
+
+    def envio() -> None:
+        with CaixaSaida() as caixa:
+            resultados = send_mail.send_mail_outbox(caixa, args.arquivo)
+            resumo = caixa.resumo(args.arquivo)
+        print(f"{sum(r.enviado for r in resultados)}/{len(resultados)} emails enviados; "
+              f"{resumo['pendente']} pendentes, {resumo['falhou']} com falha, {resumo['cancelado']} cancelados.")
+
+    # Com --pular-pagos uma conciliação nova também refaz a fila de emails; antes
+    # da primeira conciliação não há arquivo, e ninguém é pulado
+    situacao = [reconciliation.CAMINHO_SITUACAO] if args.pular_pagos and os.path.exists(reconciliation.CAMINHO_SITUACAO) else []
+
+    etapas = []
+    if incluir_socios:
+        etapas.append(Etapa('socios', lambda: generate_client_list.generate_client_list(args.arquivo_socios),
+                            entradas=[f'../socios/{args.arquivo_socios}'], saidas=[lista, generate_client_list.CAMINHO_INDICE]))
+    etapas += [
+        # Deixa a tabela de lançamentos no cache para boletos e emails lerem em paralelo
+        Etapa('lancamentos', lambda: ledger.gerar_tabela_completa(args.arquivo),
+              entradas=[lancamentos, lista], depende=['socios'] if incluir_socios else []),
+        Etapa('boletos', lambda: generate_boleto.gerar_arquivo_prosperar(ledger.gerar_tabela_completa(args.arquivo), formato=args.formato),
+              entradas=[lancamentos, lista], saidas=[f'../boletos/*_boletos_prosperar.{EXTENSOES[args.formato]}'],
+              depende=['lancamentos'], contexto=args.formato),
+        Etapa('emails', emails, entradas=[lancamentos, lista, *situacao], saidas=[CAMINHO_OUTBOX], depende=['lancamentos']),
+    ]
+    if args.enviar:
+        # A caixa de saída já evita reenvios, então o envio roda sempre
+        etapas.append(Etapa('envio', envio, depende=['emails']))
+    return etapas
+
+
+def executar(args) -> None:
+    # Chamado pelo cli.py (subcomando pipeline); os argumentos são definidos lá
+    if args.metricas:
+        metrics.ativar(args.metricas)
+    executar_pipeline(etapas_padrao(args), paralelo=not args.sequencial, forcar=args.forcar)
@@ -0,0 +1,137 @@
+import os
+
+import pandas as pd
+
+import cache
+from generate_client_list import CAMINHO_SOCIOS, COLUNAS_JUNCAO
+from ledger import COLUNAS_LANCAMENTOS, FORMAS_DE_PAGAMENTO_BOLETO
+
+# Chaves do agrupamento por sócio em montar_planilha_prosperar
+COLUNAS_AGRUPAMENTO = ['Cliente/Fornecedor', 'Email', 'Documento cliente/fornecedor', 'Endereço', 'Número', 'Bairro', 'Cidade', 'Estado', 'CEP', 'Data de vencimento']
+
+
+def _utf8(caminho: str) -> str:
+    # O leitor lazy do Polars só lê UTF-8: converte o backup (latin-1) uma vez
+    # e guarda a cópia no diretório do cache, pelo hash do conteúdo
+    destino = os.path.join(cache.DIRETORIO_CACHE, f'{cache.chave(caminho, contexto="utf8")}.csv')
+    if not os.path.exists(destino):
+        os.makedirs(cache.DIRETORIO_CACHE, exist_ok=True)
+        temporario = f'{destino}.{os.getpid()}.tmp'
+        with open(caminho, encoding='latin-1', newline='') as origem, open(temporario, 'w', encoding='utf-8', newline='') as saida:
+            for bloco in iter(lambda: origem.read(1024 * 1024), ''):
+                saida.write(bloco)
+        os.replace(temporario, destino)
+    return destino
+
+
+def _chave_documento(coluna):
+    # Mesma chave de generate_client_list.chave_documento: dígitos * 10 + tipo (1 = CPF, 2 = CNPJ)
+    import polars as pl
+
+    digitos = coluna.str.replace_all(r'\D', '')
+    digitos = pl.when(digitos != '').then(digitos)
+    tipo = pl.when(digitos.str.len_chars() > 11).then(2).otherwise(1)
+    return digitos.cast(pl.Int64) * 10 + tipo
+
+
+def _normalizar_nome(coluna):
+    # Mesma normalização de generate_client_list.normalizar_nome
+    return (
+        coluna.str.normalize('NFKD')
+        .str.replace_all(r'[^\x00-\x7F]', '')
+        .str.to_uppercase()
+        .str.replace_all(r'\s+', ' ')
+        .str.strip_chars()
+    )
+
+
+def _lancamentos(filename: str):
+    # Plano lazy: só as colunas usadas são lidas do CSV e o filtro é aplicado na leitura
+    import polars as pl
+
+    valor = pl.col('Valor').str.replace_all('.', '', literal=True).str.replace(',', '.', literal=True).cast(pl.Float64)
+    return (
+        pl.scan_csv(_utf8(f'../update/{filename}'), separator=';', infer_schema=False, empty_string_is_null=True)
+        .select(COLUNAS_LANCAMENTOS)
+        .filter(
+            pl.col('Forma de pagamento').is_in(FORMAS_DE_PAGAMENTO_BOLETO)
+            & (pl.col('Cliente/Fornecedor') != 'GRANATUM LTDA - EPP')
+        )
+        .with_columns(
+            # Alterando o valor do boletos para R$ 4,50
+            pl.when(pl.col('Categoria') == '005 - Tx Boleto').then(pl.lit(4.50)).otherwise(valor).alias('Valor'),
+            # Colocando todos os Vencimentos no dia 10
+            (pl.lit('10') + pl.col('Data de vencimento').str.slice(2)).alias('Data de vencimento'),
+        )
+    )
+
+
+def _juntar_socios(lancamentos):
+    # Mesma regra de ledger.juntar_socios: primeiro pelo documento (documento + nome
+    # quando ele é de mais de um sócio), senão pelo nome normalizado, sempre com
+    # a primeira ocorrência na lista de sócios
+    import polars as pl
+
+    socios = pl.scan_parquet(CAMINHO_SOCIOS).select(COLUNAS_JUNCAO).with_row_index('posicao')
+    documentos = (
+        socios.select(
+            _chave_documento(pl.col('CPF/CNPJ')).alias('documento'),
+            _normalizar_nome(pl.col('Nome/Razão Social')).alias('nome'),
+            'posicao',
+        )
+        .drop_nulls('documento')
+        .with_columns((pl.len().over('documento') > 1).alias('compartilhado'))
+    )
+    por_documento = documentos.filter(~pl.col('compartilhado')).select('documento', 'posicao')
+    por_documento_nome = (
+        documentos.filter(pl.col('compartilhado'))
+        .drop_nulls('nome')
+        .unique(['documento', 'nome'], keep='first', maintain_order=True)
+        .select('documento', 'nome', pl.col('posicao').alias('posicao_documento_nome'))
+    )
+    por_nome = (
+        socios.select(_normalizar_nome(pl.col('Nome/Razão Social')).alias('nome'), pl.col('posicao').alias('posicao_nome'))
+        .drop_nulls('nome')
+        .unique('nome', keep='first')
+    )
+    return (
+        lancamentos
+        .select('Cliente/Fornecedor', 'Data de vencimento', 'Descrição', 'Valor', 'Documento cliente/fornecedor')
+        .with_columns(
+            _chave_documento(pl.col('Documento cliente/fornecedor')).alias('documento'),
+            _normalizar_nome(pl.col('Cliente/Fornecedor')).alias('nome'),
+        )
+        .join(por_documento, on='documento', how='left', maintain_order='left')
+        .join(por_documento_nome, on=['documento', 'nome'], how='left', maintain_order='left')
+        .join(por_nome, on='nome', how='left', maintain_order='left')
+        .with_columns(pl.coalesce('posicao', 'posicao_documento_nome', 'posicao_nome').alias('posicao'))
+        .drop_nulls('posicao')
+        .join(socios, on='posicao', how='left', maintain_order='left')
+        .drop('documento', 'nome', 'posicao', 'posicao_documento_nome', 'posicao_nome')
+    )
+
+
+def gerar_tabela_completa(filename: str = 'backup_granatum.csv') -> pd.DataFrame:
+    # Equivalente a ledger.gerar_tabela_completa, executado pelo Polars
+    return _juntar_socios(_lancamentos(filename)).collect().to_pandas()
+
+
+def gerar_tabela_boletos(filename: str = 'backup_granatum.csv') -> pd.DataFrame:
+    # Filtro, junção e soma por sócio num único plano lazy; o resultado já vem
+    # agrupado e na ordem do groupby do pandas, pronto para gerar_arquivo_prosperar
+    import polars as pl
+
+    df = (
+        _juntar_socios(_lancamentos(filename))
+        .drop_nulls(COLUNAS_AGRUPAMENTO)
+        .group_by(COLUNAS_AGRUPAMENTO)
+        # Soma em centavos: a ordem das parcelas no Polars não é fixa, e somar
+        # floats direto mudaria o último dígito de uma execução para outra
+        .agg((pl.col('Valor') * 100).round().cast(pl.Int64).sum())
+        .sort(COLUNAS_AGRUPAMENTO)
+        .collect()
+        .to_pandas()
+    )
+    # Divisão feita no numpy (o Polars multiplica por 0,01 e perde o arredondamento exato)
+    df['Valor'] = df['Valor'] / 100
+    return df
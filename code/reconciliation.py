@@ -0,0 +1,277 @@
+import glob
+import os
+import unicodedata
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from exporters import exportar
+
+DIRETORIO_CONCILIACAO = '../conciliacao'
+# Um Parquet por planilha de boletos gerada, com os IDs emitidos nela
+DIRETORIO_EMITIDOS = os.path.join(DIRETORIO_CONCILIACAO, 'emitidos')
+# Situação de cada ID na última conciliação (lida pelo envio dos emails)
+CAMINHO_SITUACAO = os.path.join(DIRETORIO_CONCILIACAO, 'situacao.parquet')
+# Exportações de boletos pagos baixadas do ProsperarBank
+DIRETORIO_RETORNOS = '../retornos'
+
+EM_ABERTO = 'em aberto'
+PAGO = 'pago'
+VALOR_DIVERGENTE = 'valor divergente'
+PAGO_EM_DUPLICIDADE = 'pago em duplicidade'
+# Mesmo ID Externo emitido para sócios ou valores diferentes: o pagamento não é atribuído
+ID_EM_CONFLITO = 'ID emitido mais de uma vez'
+ID_NAO_EMITIDO = 'ID não emitido'
+
+# Nomes aceitos para cada coluna da exportação do banco (sem acento, minúsculas)
+COLUNAS_RETORNO = {
+    'id': ['id externo', 'id externo*', 'identificador externo', 'seu numero'],
+    'valor_pago': ['valor pago', 'valor pago (r$)', 'valor recebido', 'valor liquidado', 'valor'],
+    'data_pagamento': ['data de pagamento', 'data do pagamento', 'data pagamento', 'pago em', 'data de liquidacao'],
+    'situacao': ['situacao', 'status'],
+}
+SITUACOES_PAGAS = {'pago', 'paga', 'liquidado', 'liquidada', 'compensado', 'recebido'}
+
+
+def _sem_acento(texto: str) -> str:
+    return unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode().strip().lower()
+
+
+def normalizar_id(serie: pd.Series) -> pd.Series:
+    # Planilhas do banco podem trazer o ID como número (202312001.0)
+    return serie.astype('string').str.strip().str.replace(r'\.0$', '', regex=True)
+
+
+def hash_ids(serie: pd.Series) -> np.ndarray:
+    # IDs viram inteiros de 64 bits: a junção é uma busca em tabela hash, O(n)
+    return pd.util.hash_array(normalizar_id(serie).fillna('').to_numpy(dtype=object))
+
+
+def _centavos(serie: pd.Series) -> np.ndarray:
+    if not pd.api.types.is_numeric_dtype(serie):
+        # Formato brasileiro: R$ 1.234,56
+        serie = pd.to_numeric(
+            serie.astype('string').str.replace(r'[^0-9,.-]', '', regex=True).str.replace('.', '', regex=False).str.replace(',', '.', regex=False),
+            errors='coerce',
+        )
+    # Fica em float: valor ilegível vira NaN em vez de zero
+    return np.rint(serie.to_numpy(dtype=np.float64, na_value=np.nan) * 100)
+
+
+def registrar_emissao(planilha: pd.DataFrame, arquivo: str) -> str:
+    # Chamado para cada planilha do ProsperarBank gerada: guarda ID, sócio,
+    # vencimento e valor; gerar a mesma planilha de novo substitui o registro
+    emitidos = pd.DataFrame({
+        'id': normalizar_id(planilha['ID Externo*']).to_numpy(dtype=object),
+        'nome': planilha['Nome Completo do Pagador (Sacado)*'].astype(str).to_numpy(),
+        'documento': planilha['CPF/CNPJ*'].astype(str).to_numpy(),
+        'email': planilha['E-mail*'].astype(str).to_numpy(),
+        'vencimento': planilha['Vencimento*'].astype(str).to_numpy(),
+        'centavos': np.rint(planilha['Valor (R$)*'].to_numpy(dtype=np.float64) * 100).astype(np.int64),
+        'arquivo': os.path.basename(arquivo),
+        'emitido_em': datetime.now(),
+    })
+    os.makedirs(DIRETORIO_EMITIDOS, exist_ok=True)
+    caminho = os.path.join(DIRETORIO_EMITIDOS, f'{os.path.splitext(os.path.basename(arquivo))[0]}.parquet')
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    emitidos.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def ultima_sequencia(mes: str, diretorio: str = DIRETORIO_EMITIDOS) -> int:
+    # Maior sequência já emitida no mês (AAAAMM) em qualquer planilha: a
+    # planilha nova continua a numeração, e o ID Externo não se repete entre
+    # a planilha do mês e as do incremental
+    maior = 0
+    for arquivo in glob.glob(os.path.join(diretorio, '*.parquet')):
+        ids = pd.read_parquet(arquivo, columns=['id'])['id'].astype(str)
+        sequencias = pd.to_numeric(ids[ids.str.startswith(mes)].str[len(mes):], errors='coerce')
+        if sequencias.notna().any():
+            maior = max(maior, int(sequencias.max()))
+    return maior
+
+
+def _chave_boleto(nome: pd.Series, documento: pd.Series, vencimento: pd.Series) -> pd.Series:
+    return nome.astype(str) + '|' + documento.astype(str) + '|' + vencimento.astype(str)
+
+
+def reaproveitar_ids(planilha: pd.DataFrame, arquivo_base: str, diretorio: str = DIRETORIO_EMITIDOS) -> pd.DataFrame:
+    # Refazer uma planilha já emitida mantém o ID Externo de cada boleto
+    # (mesmo sócio, documento e vencimento), que pode já ter sido pago; só
+    # os boletos novos ficam com os IDs da sequência nova
+    caminho = os.path.join(diretorio, f'{arquivo_base}.parquet')
+    if not os.path.exists(caminho):
+        return planilha
+    anteriores = pd.read_parquet(caminho, columns=['id', 'nome', 'documento', 'vencimento'])
+    ids = pd.Series(anteriores['id'].to_numpy(), index=_chave_boleto(anteriores['nome'], anteriores['documento'], anteriores['vencimento']))
+    ids = ids[~ids.index.duplicated()]
+    chaves = _chave_boleto(planilha['Nome Completo do Pagador (Sacado)*'], planilha['CPF/CNPJ*'], planilha['Vencimento*'])
+    planilha = planilha.copy()
+    planilha['ID Externo*'] = chaves.map(ids).fillna(planilha['ID Externo*'])
+    return planilha
+
+
+def ler_emitidos(diretorio: str = DIRETORIO_EMITIDOS) -> pd.DataFrame:
+    # Índice de todos os meses. O mesmo boleto (ID, sócio e valor) emitido de
+    # novo em outra planilha fica só com a emissão mais recente; um ID emitido
+    # para sócios ou valores diferentes (planilhas anteriores à numeração
+    # contínua do mês) mantém todas as emissões, marcadas em ``conflito``
+    arquivos = sorted(glob.glob(os.path.join(diretorio, '*.parquet')))
+    if not arquivos:
+        return pd.DataFrame(columns=['id', 'nome', 'documento', 'email', 'vencimento', 'centavos', 'arquivo', 'emitido_em', 'conflito'])
+    emitidos = pd.concat([pd.read_parquet(arquivo) for arquivo in arquivos], ignore_index=True)
+    emitidos = emitidos.sort_values('emitido_em', kind='stable')
+    emitidos = emitidos[~emitidos.duplicated(['id', 'nome', 'centavos'], keep='last')].reset_index(drop=True)
+
+    emitidos['conflito'] = emitidos['id'].duplicated(keep=False)
+    if emitidos['conflito'].any():
+        conflitos = emitidos[emitidos['conflito']]
+        exemplos = ', '.join(f'{i} ({", ".join(g["nome"])})' for i, g in list(conflitos.groupby('id'))[:5])
+        print(f'{conflitos["id"].nunique()} IDs emitidos para sócios ou valores diferentes; '
+              f'pagamentos desses IDs vão para as divergências: {exemplos}')
+    return emitidos
+
+
+def _coluna(df: pd.DataFrame, tipo: str, obrigatoria: bool = True) -> Optional[str]:
+    colunas = {_sem_acento(coluna): coluna for coluna in df.columns}
+    for nome in COLUNAS_RETORNO[tipo]:
+        if nome in colunas:
+            return colunas[nome]
+    if obrigatoria:
+        raise ValueError(f'Coluna de {tipo} não encontrada; colunas do arquivo: {", ".join(map(str, df.columns))}')
+    return None
+
+
+def ler_retorno(caminho: str) -> pd.DataFrame:
+    # Exportação de boletos pagos do ProsperarBank (CSV ou planilha)
+    if caminho.lower().endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(caminho, dtype=str)
+    else:
+        df = pd.read_csv(caminho, sep=None, engine='python', dtype=str, encoding='utf-8-sig')
+
+    situacao = _coluna(df, 'situacao', obrigatoria=False)
+    if situacao is not None:
+        df = df[df[situacao].map(_sem_acento).isin(SITUACOES_PAGAS)]
+
+    data = _coluna(df, 'data_pagamento', obrigatoria=False)
+    return pd.DataFrame({
+        'id': normalizar_id(df[_coluna(df, 'id')]).to_numpy(dtype=object),
+        'centavos_pagos': _centavos(df[_coluna(df, 'valor_pago')]),
+        'data_pagamento': pd.to_datetime(df[data], dayfirst=True, errors='coerce').to_numpy() if data else pd.NaT,
+        'retorno': os.path.basename(caminho),
+    })
+
+
+def ler_retornos(caminhos: Sequence[str]) -> pd.DataFrame:
+    pagamentos = [ler_retorno(caminho) for caminho in caminhos]
+    if not pagamentos:
+        return pd.DataFrame(columns=['id', 'centavos_pagos', 'data_pagamento', 'retorno'])
+    # O mesmo pagamento pode aparecer em exportações sobrepostas do banco
+    return pd.concat(pagamentos, ignore_index=True).drop_duplicates(['id', 'centavos_pagos', 'data_pagamento'])
+
+
+@metrics.etapa('conciliar')
+def conciliar(emitidos: pd.DataFrame, pagamentos: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Junta pagamentos e boletos emitidos pelo hash do ID; devolve a situação
+    # de cada boleto emitido e os pagamentos sem boleto: IDs que não constam no
+    # índice ou emitidos mais de uma vez (sem como saber de qual sócio é)
+    conflito = emitidos['id'].duplicated(keep=False).to_numpy()
+    emitidos_hash, pagamentos_hash = hash_ids(emitidos['id']), hash_ids(pagamentos['id'])
+    unicos = np.flatnonzero(~conflito)
+    posicoes = pd.Index(emitidos_hash[unicos]).get_indexer(pagamentos_hash)
+    encontrados = posicoes >= 0
+    posicoes[encontrados] = unicos[posicoes[encontrados]]
+    ambiguos = ~encontrados & np.isin(pagamentos_hash, emitidos_hash[conflito])
+
+    # Soma e contagem dos pagamentos por boleto, sem agrupar por texto
+    n = len(emitidos)
+    pago = np.bincount(posicoes[encontrados], weights=np.nan_to_num(pagamentos['centavos_pagos'].to_numpy(dtype=np.float64)[encontrados]), minlength=n)
+    quantidade = np.bincount(posicoes[encontrados], minlength=n)
+    ultima_data = pd.Series(pagamentos['data_pagamento'].to_numpy()[encontrados]).groupby(posicoes[encontrados]).max()
+
+    situacao = emitidos.copy()
+    situacao['centavos_pagos'] = pago.astype(np.int64)
+    situacao['pagamentos'] = quantidade
+    situacao['data_pagamento'] = ultima_data.reindex(np.arange(n)).to_numpy()
+    situacao['situacao'] = np.select(
+        [conflito, quantidade == 0, quantidade > 1, situacao['centavos_pagos'].to_numpy() != situacao['centavos'].to_numpy()],
+        [ID_EM_CONFLITO, EM_ABERTO, PAGO_EM_DUPLICIDADE, VALOR_DIVERGENTE],
+        PAGO,
+    )
+    sem_boleto = pagamentos[~encontrados].reset_index(drop=True)
+    sem_boleto['situacao'] = np.where(ambiguos[~encontrados], ID_EM_CONFLITO, ID_NAO_EMITIDO)
+    return situacao, sem_boleto
+
+
+def _relatorio(situacao: pd.DataFrame) -> pd.DataFrame:
+    relatorio = situacao[['id', 'nome', 'documento', 'email', 'vencimento', 'arquivo', 'situacao', 'data_pagamento']].copy()
+    relatorio.insert(5, 'valor', situacao['centavos'] / 100)
+    relatorio.insert(6, 'valor_pago', situacao['centavos_pagos'] / 100)
+    return relatorio
+
+
+def relatorios(situacao: pd.DataFrame, sem_boleto: pd.DataFrame, hoje: Optional[date] = None) -> Dict[str, pd.DataFrame]:
+    hoje = pd.Timestamp(hoje or date.today())
+    em_aberto = _relatorio(situacao[situacao['situacao'] == EM_ABERTO]).drop(columns=['valor_pago', 'data_pagamento'])
+    em_aberto['vencido'] = pd.to_datetime(em_aberto['vencimento'], format='%d/%m/%Y', errors='coerce') < hoje
+
+    divergencias = _relatorio(situacao[situacao['situacao'].isin([VALOR_DIVERGENTE, PAGO_EM_DUPLICIDADE, ID_EM_CONFLITO])])
+    if len(sem_boleto):
+        divergencias = pd.concat([divergencias, pd.DataFrame({
+            'id': sem_boleto['id'],
+            'valor_pago': sem_boleto['centavos_pagos'] / 100,
+            'data_pagamento': sem_boleto['data_pagamento'],
+            'arquivo': sem_boleto['retorno'],
+            'situacao': sem_boleto['situacao'],
+        })], ignore_index=True)
+
+    return {
+        'em_aberto': em_aberto,
+        'pagos': _relatorio(situacao[situacao['situacao'] == PAGO]),
+        'divergencias': divergencias,
+    }
+
+
+def quitados(grupos: Iterable, caminho: str = CAMINHO_SITUACAO) -> Set[str]:
+    # Sócios (pelo nome, como nos emails) cujos boletos do mesmo vencimento
+    # já constam como pagos na última conciliação
+    if not os.path.exists(caminho):
+        return set()
+    situacao = pd.read_parquet(caminho, columns=['nome', 'vencimento', 'situacao'])
+    por_socio = situacao['situacao'].eq(PAGO).groupby([situacao['nome'], situacao['vencimento']]).all()
+    pagos = set(por_socio.index[por_socio.to_numpy()])
+    return {grupo.nome for grupo in grupos if (grupo.nome, grupo.vencimento) in pagos}
+
+
+def executar(args) -> None:
+    # Chamado pelo cli.py (subcomando conciliar); os argumentos são definidos lá
+    if args.metricas:
+        metrics.ativar(args.metricas)
+
+    emitidos = ler_emitidos()
+    if emitidos.empty:
+        raise SystemExit(f'Nenhum boleto emitido registrado em {DIRETORIO_EMITIDOS}; gere os boletos primeiro')
+    # Nomes soltos são procurados em ../retornos, como os backups em ../update
+    retornos = [c if os.path.exists(c) else os.path.join(DIRETORIO_RETORNOS, c) for c in args.retornos or []] or sorted(
+        caminho for caminho in glob.glob(os.path.join(DIRETORIO_RETORNOS, '*'))
+        if caminho.lower().endswith(('.csv', '.xlsx', '.xls'))
+    )
+    pagamentos = ler_retornos(retornos)
+
+    situacao, sem_boleto = conciliar(emitidos, pagamentos)
+    situacao.to_parquet(CAMINHO_SITUACAO, index=False)
+
+    for nome, relatorio in relatorios(situacao, sem_boleto).items():
+        caminho = exportar(relatorio, os.path.join(DIRETORIO_CONCILIACAO, nome), args.formato)
+        print(f'{nome}: {len(relatorio)} boletos em {caminho}')
+
+    contagem = situacao['situacao'].value_counts()
+    print(f"{len(emitidos)} boletos emitidos, {len(pagamentos)} pagamentos em {len(retornos)} arquivos: "
+          f"{contagem.get(PAGO, 0)} pagos, {contagem.get(EM_ABERTO, 0)} em aberto, "
+          f"{contagem.get(VALOR_DIVERGENTE, 0) + contagem.get(PAGO_EM_DUPLICIDADE, 0)} divergentes, "
+          f"{contagem.get(ID_EM_CONFLITO, 0)} com ID em conflito, "
+          f"{int((sem_boleto['situacao'] == ID_NAO_EMITIDO).sum())} pagamentos de IDs não emitidos")
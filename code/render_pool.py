@@ -0,0 +1,84 @@
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+from mail_template import BOLETO_URL_PADRAO, TemplateEmail
+from member_groups import ExtratoSocio
+
+
+class EmailRenderizado(NamedTuple):
+    nome: str
+    email: str
+    html: str
+    texto: str
+    total: float
+
+
+_FIM = object()
+
+# Template compilado uma vez em cada processo do pool
+_template: Optional[TemplateEmail] = None
+
+
+def _inicializar(boleto_url: str) -> None:
+    global _template
+    _template = TemplateEmail(boleto_url=boleto_url)
+
+
+def _renderizar_lote(grupos: List[ExtratoSocio]) -> List[EmailRenderizado]:
+    emails = []
+    for grupo in grupos:
+        dados = (grupo.nome, grupo.vencimento, grupo.descricoes, grupo.valores, grupo.total)
+        emails.append(EmailRenderizado(grupo.nome, grupo.email, _template.render(*dados), _template.texto(*dados), grupo.total))
+    return emails
+
+
+def _produzir(grupos: Sequence[ExtratoSocio], fila: queue.Queue, processos: int, tamanho_lote: int, boleto_url: str) -> None:
+    # Distribui os sócios em lotes pelo pool e repassa os emails prontos para a
+    # fila na ordem original; a fila cheia segura a produção (backpressure)
+    try:
+        with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar, initargs=(boleto_url,)) as executor:
+            pendentes = deque()
+            for inicio in range(0, len(grupos), tamanho_lote):
+                pendentes.append(executor.submit(_renderizar_lote, list(grupos[inicio:inicio + tamanho_lote])))
+                if len(pendentes) >= 2 * processos:
+                    for email in pendentes.popleft().result():
+                        fila.put(email)
+            while pendentes:
+                for email in pendentes.popleft().result():
+                    fila.put(email)
+    except BaseException as e:
+        fila.put(e)
+    finally:
+        fila.put(_FIM)
+
+
+def renderizar_em_paralelo(
+    grupos: Sequence[ExtratoSocio],
+    processos: Optional[int] = None,
+    tamanho_lote: int = 50,
+    tamanho_fila: int = 500,
+    boleto_url: str = BOLETO_URL_PADRAO,
+) -> Iterator[EmailRenderizado]:
+    # Renderiza em vários processos e entrega os emails conforme ficam prontos,
+    # para o envio começar enquanto o restante ainda está sendo renderizado
+    fila: queue.Queue = queue.Queue(maxsize=tamanho_fila)
+    produtor = threading.Thread(
+        target=_produzir,
+        args=(grupos, fila, processos or os.cpu_count() or 1, tamanho_lote, boleto_url),
+        daemon=True,
+    )
+    produtor.start()
+
+    while True:
+        item = fila.get()
+        if item is _FIM:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+    produtor.join()
@@ -0,0 +1,292 @@
+import asyncio
+import base64
+import random
+import ssl
+import threading
+from collections import Counter
+from typing import List, Optional
+
+# Maior linha aceita no DATA (as linhas de um email MIME têm até ~1000 bytes)
+LIMITE_LINHA = 1024 * 1024
+
+
+class SumidouroSMTP:
+    """Servidor SMTP local para testes: aceita as mensagens e não entrega nada.
+
+    Fala o suficiente do protocolo para o smtplib (EHLO, STARTTLS se houver
+    certificado, AUTH PLAIN/LOGIN se houver usuário, MAIL, RCPT, DATA) e
+    simula um provedor lento ou instável: ``latencia`` (+ ``variacao``
+    aleatória) segundos antes de responder ao DATA, e frações das mensagens
+    recusadas com 4xx, 5xx ou com a conexão derrubada (``queda``).
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        porta: int = 8025,
+        usuario: Optional[str] = None,
+        senha: Optional[str] = None,
+        certificado: Optional[str] = None,
+        chave: Optional[str] = None,
+        latencia: float = 0.0,
+        variacao: float = 0.0,
+        falha_4xx: float = 0.0,
+        falha_5xx: float = 0.0,
+        queda: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.host = host
+        self.porta = porta
+        self.usuario = usuario
+        self.senha = senha
+        self.latencia = latencia
+        self.variacao = variacao
+        self.falha_4xx = falha_4xx
+        self.falha_5xx = falha_5xx
+        self.queda = queda
+        self.aleatorio = random.Random(seed)
+
+        self.contexto_tls = None
+        if certificado:
+            self.contexto_tls = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.contexto_tls.load_cert_chain(certificado, chave)
+
+        # recebidas, recusadas_4xx, recusadas_5xx, quedas, sessoes, tls, autenticacoes, bytes
+        self.contagem: Counter = Counter()
+        # Quantas vezes cada destinatário recebeu, para conferir reenvios duplicados
+        self.destinatarios: Counter = Counter()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def duplicadas(self) -> int:
+        return sum(n - 1 for n in self.destinatarios.values() if n > 1)
+
+    def _extensoes(self, tls: bool) -> List[str]:
+        extensoes = ['8BITMIME', f'SIZE {50 * 1024 * 1024}']
+        # StreamWriter.start_tls só existe a partir do Python 3.11
+        if self.contexto_tls is not None and not tls and hasattr(asyncio.StreamWriter, 'start_tls'):
+            extensoes.append('STARTTLS')
+        if self.usuario:
+            extensoes.append('AUTH PLAIN LOGIN')
+        return extensoes
+
+    async def _autenticar(self, argumento: str, leitor, responder) -> bool:
+        mecanismo, _, inicial = argumento.partition(' ')
+        mecanismo = mecanismo.upper()
+        try:
+            if mecanismo == 'PLAIN':
+                if not inicial:
+                    await responder('334 ')
+                    inicial = (await leitor.readline()).decode().strip()
+                _, usuario, senha = base64.b64decode(inicial).decode().split('\0')
+            elif mecanismo == 'LOGIN':
+                if not inicial:
+                    await responder('334 VXNlcm5hbWU6')
+                    inicial = (await leitor.readline()).decode().strip()
+                usuario = base64.b64decode(inicial).decode()
+                await responder('334 UGFzc3dvcmQ6')
+                senha = base64.b64decode((await leitor.readline()).strip()).decode()
+            else:
+                await responder('504 5.5.4 Mecanismo nao suportado')
+                return False
+        except ValueError:
+            await responder('501 5.5.2 Resposta de autenticacao invalida')
+            return False
+
+        if usuario == self.usuario and senha == self.senha:
+            self.contagem['autenticacoes'] += 1
+            await responder('235 2.7.0 Autenticado')
+            return True
+        await responder('535 5.7.8 Usuario ou senha invalidos')
+        return False
+
+    async def _receber_dados(self, leitor) -> int:
+        tamanho = 0
+        while True:
+            linha = await leitor.readline()
+            if not linha:
+                raise ConnectionResetError('conexão encerrada durante o DATA')
+            if linha in (b'.\r\n', b'.\n'):
+                return tamanho
+            tamanho += len(linha)
+
+    async def _sessao(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        self.contagem['sessoes'] += 1
+        tls = False
+        autenticado = not self.usuario
+        remetente = None
+        destinatarios: List[str] = []
+
+        async def responder(linha: str) -> None:
+            # Respostas SMTP são ASCII (RFC 5321), por isso os textos sem acento
+            escritor.write(f'{linha}\r\n'.encode('ascii'))
+            await escritor.drain()
+
+        try:
+            await responder('220 localhost ESMTP sumidouro de teste')
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                comando, _, argumento = linha.decode('utf-8', 'replace').strip().partition(' ')
+                comando = comando.upper()
+
+                if comando == 'EHLO':
+                    linhas = ['localhost'] + self._extensoes(tls)
+                    for extensao in linhas[:-1]:
+                        escritor.write(f'250-{extensao}\r\n'.encode())
+                    await responder(f'250 {linhas[-1]}')
+                elif comando == 'HELO':
+                    await responder('250 localhost')
+                elif comando == 'STARTTLS':
+                    if 'STARTTLS' not in self._extensoes(tls):
+                        await responder('502 5.5.1 STARTTLS indisponivel')
+                        continue
+                    await responder('220 2.0.0 Pronto para TLS')
+                    await escritor.start_tls(self.contexto_tls)
+                    # Depois do TLS o cliente recomeça do EHLO (RFC 3207)
+                    tls, autenticado, remetente, destinatarios = True, not self.usuario, None, []
+                    self.contagem['tls'] += 1
+                elif comando == 'AUTH':
+                    if not self.usuario:
+                        await responder('502 5.5.1 AUTH nao habilitado')
+                    elif autenticado:
+                        await responder('503 5.5.1 Ja autenticado')
+                    else:
+                        autenticado = await self._autenticar(argumento, leitor, responder)
+                elif comando == 'MAIL':
+                    if not autenticado:
+                        await responder('530 5.7.0 Autenticacao necessaria')
+                    else:
+                        remetente, destinatarios = argumento, []
+                        await responder('250 2.1.0 OK')
+                elif comando == 'RCPT':
+                    if remetente is None:
+                        await responder('503 5.5.1 MAIL primeiro')
+                    else:
+                        destinatarios.append(argumento.partition(':')[2].strip().strip('<>'))
+                        await responder('250 2.1.5 OK')
+                elif comando == 'DATA':
+                    if not destinatarios:
+                        await responder('503 5.5.1 RCPT primeiro')
+                        continue
+                    await responder('354 Termine com <CRLF>.<CRLF>')
+                    tamanho = await self._receber_dados(leitor)
+
+                    if self.latencia or self.variacao:
+                        await asyncio.sleep(self.latencia + self.aleatorio.uniform(0, self.variacao))
+                    sorteio = self.aleatorio.random()
+                    if sorteio < self.queda:
+                        # Conexão derrubada sem resposta: o cliente não sabe se a mensagem foi aceita
+                        self.contagem['quedas'] += 1
+                        break
+                    sorteio -= self.queda
+                    if sorteio < self.falha_4xx:
+                        self.contagem['recusadas_4xx'] += 1
+                        await responder('451 4.3.0 Falha temporaria simulada, tente mais tarde')
+                    elif sorteio - self.falha_4xx < self.falha_5xx:
+                        self.contagem['recusadas_5xx'] += 1
+                        await responder('550 5.1.1 Falha permanente simulada')
+                    else:
+                        self.contagem['recebidas'] += 1
+                        self.contagem['bytes'] += tamanho
+                        self.destinatarios.update(destinatarios)
+                        await responder('250 2.0.0 Mensagem aceita')
+                    remetente, destinatarios = None, []
+                elif comando == 'RSET':
+                    remetente, destinatarios = None, []
+                    await responder('250 2.0.0 OK')
+                elif comando == 'NOOP':
+                    await responder('250 2.0.0 OK')
+                elif comando == 'QUIT':
+                    await responder('221 2.0.0 Ate logo')
+                    break
+                else:
+                    await responder('502 5.5.2 Comando nao reconhecido')
+        except (ConnectionError, ssl.SSLError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _abrir(self) -> asyncio.AbstractServer:
+        servidor = await asyncio.start_server(self._sessao, self.host, self.porta, limit=LIMITE_LINHA)
+        # Com porta 0 o sistema escolhe uma livre
+        self.porta = servidor.sockets[0].getsockname()[1]
+        return servidor
+
+    async def servir(self) -> None:
+        async with await self._abrir() as servidor:
+            await servidor.serve_forever()
+
+    def iniciar(self) -> 'SumidouroSMTP':
+        # Roda o servidor numa thread própria, para o smtplib (bloqueante) usá-lo no mesmo processo
+        pronto = threading.Event()
+        erro: List[BaseException] = []
+        self._loop = asyncio.new_event_loop()
+
+        def rodar() -> None:
+            asyncio.set_event_loop(self._loop)
+            try:
+                servidor = self._loop.run_until_complete(self._abrir())
+            except BaseException as e:
+                erro.append(e)
+                pronto.set()
+                return
+            pronto.set()
+            self._loop.run_forever()
+
+            servidor.close()
+            sessoes = asyncio.all_tasks(self._loop)
+            for tarefa in sessoes:
+                tarefa.cancel()
+            self._loop.run_until_complete(asyncio.gather(*sessoes, return_exceptions=True))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=rodar, name='sumidouro-smtp', daemon=True)
+        self._thread.start()
+        pronto.wait()
+        if erro:
+            raise erro[0]
+        return self
+
+    def parar(self) -> None:
+        if self._thread is None:
+            return
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> 'SumidouroSMTP':
+        return self.iniciar()
+
+    def __exit__(self, *exc) -> None:
+        self.parar()
+
+
+def executar(args) -> None:
+    # Chamado pelo cli.py (subcomando smtp-local); os argumentos são definidos lá
+    sumidouro = SumidouroSMTP(
+        host=args.host,
+        porta=args.porta,
+        usuario=args.usuario,
+        senha=args.senha,
+        certificado=args.certificado,
+        chave=args.chave,
+        latencia=args.latencia,
+        variacao=args.variacao,
+        falha_4xx=args.falha_4xx,
+        falha_5xx=args.falha_5xx,
+        queda=args.queda,
+        seed=args.seed,
+    )
+    print(f'Servidor SMTP de teste em {args.host}:{args.porta} (Ctrl+C para sair); nada é entregue')
+    try:
+        asyncio.run(sumidouro.servir())
+    except KeyboardInterrupt:
+        pass
+    print(f"{sumidouro.contagem['recebidas']} mensagens recebidas em {sumidouro.contagem['sessoes']} sessões; "
+          f"{sumidouro.contagem['recusadas_4xx']} recusadas com 4xx, {sumidouro.contagem['recusadas_5xx']} com 5xx, "
+          f"{sumidouro.contagem['quedas']} conexões derrubadas")
@@ -0,0 +1,123 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+PRIMEIROS_NOMES = [
+    'JOÃO', 'MARIA', 'JOSÉ', 'ANA', 'ANTÔNIO', 'FRANCISCA', 'LUÍS', 'ADRIANA', 'PAULO', 'JULIANA',
+    'CARLOS', 'MÁRCIA', 'SEBASTIÃO', 'FERNANDA', 'DANIEL', 'PATRÍCIA', 'RAFAEL', 'ALINE', 'MARCOS', 'SANDRA',
+]
+SOBRENOMES = [
+    'SILVA', 'SANTOS', 'OLIVEIRA', 'SOUZA', 'RODRIGUES', 'FERREIRA', 'ALVES', 'PEREIRA', 'LIMA', 'GOMES',
+    'COSTA', 'RIBEIRO', 'MARTINS', 'CARVALHO', 'ARAÚJO', 'CONCEIÇÃO', 'ASSUNÇÃO', 'GONÇALVES', 'TAKESHI', 'ROSA',
+]
+CIDADES = [('Mairiporã', 'SP'), ('São Paulo', 'SP'), ('Guarulhos', 'SP'), ('Atibaia', 'SP'), ('Caieiras', 'SP'), ('Belo Horizonte', 'MG')]
+BAIRROS = ['São Pedro', 'Centro', 'Jardim América', 'Vila Mariana', 'Terra Preta', 'Parque Jaraguá']
+
+CATEGORIAS = ['001 - Mensalidade', '002 - Fundo de Reforma', '003 - Contribuição Extra', '004 - Festa', '005 - Tx Boleto']
+FORMAS_DE_PAGAMENTO = ['Boleto - Granatum Pagamentos', 'Boleto ProsperarBank', 'Pix', 'Dinheiro', 'Transferência']
+PESOS_FORMAS = [0.35, 0.35, 0.15, 0.1, 0.05]
+
+
+def _cpfs(n: int, rng: np.random.Generator) -> np.ndarray:
+    # CPFs com dígitos verificadores válidos, calculados em bloco
+    base = rng.integers(0, 10, size=(n, 9))
+    d1 = (base * np.arange(10, 1, -1)).sum(axis=1) * 10 % 11 % 10
+    d2 = (np.column_stack([base, d1]) * np.arange(11, 1, -1)).sum(axis=1) * 10 % 11 % 10
+    digitos = np.column_stack([base, d1, d2]).astype(str)
+    texto = pd.Series([''.join(linha) for linha in digitos])
+    return (texto.str[:3] + '.' + texto.str[3:6] + '.' + texto.str[6:9] + '-' + texto.str[9:]).to_numpy()
+
+
+def gerar_socios(n_socios: int, seed: int = 42) -> pd.DataFrame:
+    # Exportação de clientes do Granatum com os nomes de coluna esperados
+    rng = np.random.default_rng(seed)
+    nomes = (
+        pd.Series(rng.choice(PRIMEIROS_NOMES, n_socios)) + ' '
+        + pd.Series(rng.choice(SOBRENOMES, n_socios)) + ' '
+        + pd.Series(rng.choice(SOBRENOMES, n_socios)) + ' '
+        + pd.Series(np.arange(n_socios)).astype(str)
+    )
+    cidades = rng.integers(0, len(CIDADES), n_socios)
+    return pd.DataFrame({
+        'Nome/Razão Social': nomes,
+        'Nome fantasia': '',
+        'CPF/CNPJ': _cpfs(n_socios, rng),
+        'Email': [f'socio{i}@exemplo.com.br' for i in range(n_socios)],
+        'Telefone': '(11) 4444-0000',
+        'Endereço': 'Estrada João Mineiro',
+        'Número': rng.integers(1, 5000, n_socios),
+        'Complemento': np.where(rng.random(n_socios) < 0.3, 'Casa 2', ''),
+        'Bairro': rng.choice(BAIRROS, n_socios),
+        'Cidade': [CIDADES[i][0] for i in cidades],
+        'Estado': [CIDADES[i][1] for i in cidades],
+        'CEP': pd.Series(rng.integers(1_000_000, 99_999_999, n_socios)).astype(str).str.zfill(8),
+        'Ativo': np.where(rng.random(n_socios) < 0.95, 'Sim', 'Não'),
+        'Observações': '',
+    })
+
+
+def gerar_lancamentos(n_linhas: int, socios: pd.DataFrame, vencimento: str = '15/12/2023', seed: int = 42) -> pd.DataFrame:
+    # Backup de lançamentos do Granatum: valores em formato brasileiro (1234,56)
+    rng = np.random.default_rng(seed + 1)
+    quem = rng.integers(0, len(socios), n_linhas)
+    # Uma pequena parte dos lançamentos é do próprio Granatum (excluídos pelos scripts)
+    granatum = rng.random(n_linhas) < 0.01
+    clientes = np.where(granatum, 'GRANATUM LTDA - EPP', socios['Nome/Razão Social'].to_numpy()[quem])
+    documentos = np.where(granatum, '', socios['CPF/CNPJ'].to_numpy()[quem])
+
+    categorias = rng.choice(CATEGORIAS, n_linhas)
+    valores = pd.Series(rng.uniform(5, 900, n_linhas).round(2)).map('{:.2f}'.format).str.replace('.', ',', regex=False)
+    dia, mes, ano = vencimento.split('/')
+    dias = pd.Series(rng.integers(1, 29, n_linhas)).astype(str).str.zfill(2)
+
+    return pd.DataFrame({
+        'Tipo': 'Receita',
+        'Data de competência': f'01/{mes}/{ano}',
+        'Data de vencimento': (dias + f'/{mes}/{ano}').to_numpy(),
+        'Data de pagamento': '',
+        'Descrição': pd.Series(categorias).str[6:] + f' {mes}/{ano}',
+        'Valor': valores.to_numpy(),
+        'Categoria': categorias,
+        'Centro de custo': 'NSJB',
+        'Conta': 'ProsperarBank',
+        'Forma de pagamento': rng.choice(FORMAS_DE_PAGAMENTO, n_linhas, p=PESOS_FORMAS),
+        'Cliente/Fornecedor': clientes,
+        'Documento cliente/fornecedor': documentos,
+        'Observação': '',
+    })
+
+
+def escrever_dataset(destino: str, n_linhas: int, n_socios: int, data: str = '20231129', seed: int = 42) -> dict:
+    # Grava os arquivos na mesma estrutura de pastas usada pelos scripts
+    for pasta in ('update', 'socios', 'boletos'):
+        os.makedirs(os.path.join(destino, pasta), exist_ok=True)
+
+    socios = gerar_socios(n_socios, seed)
+    lancamentos = gerar_lancamentos(n_linhas, socios, seed=seed)
+
+    arquivos = {
+        'socios': os.path.join(destino, 'socios', f'backup_cliente_{data}.csv'),
+        'lancamentos': os.path.join(destino, 'update', f'backup_granatum_{data}.csv'),
+    }
+    socios.to_csv(arquivos['socios'], sep=';', encoding='latin-1', index=False)
+    lancamentos.to_csv(arquivos['lancamentos'], sep=';', encoding='latin-1', index=False)
+    return arquivos
+
+
+TAMANHOS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera exportações fictícias do Granatum (lançamentos e sócios).')
+    parser.add_argument('destino', help='pasta onde serão criadas update/, socios/ e boletos/')
+    parser.add_argument('--linhas', default='100k', help=f'número de lançamentos ou um de {", ".join(TAMANHOS)}')
+    parser.add_argument('--socios', type=int, default=10_000)
+    parser.add_argument('--data', default='20231129', help='data usada no nome dos arquivos (AAAAMMDD)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    linhas = TAMANHOS.get(args.linhas.lower()) or int(args.linhas)
+    for tipo, caminho in escrever_dataset(args.destino, linhas, args.socios, args.data, args.seed).items():
+        print(f'{tipo}: {caminho}')
@@ -0,0 +1,119 @@
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+# Sintaxe básica de email: algo@dominio.tld, sem espaços
+PADRAO_EMAIL = r'[^@\s]+@[^@\s]+\.[^@\s.]+'
+
+PESOS_CNPJ_1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+PESOS_CNPJ_2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+
+def _matriz_digitos(textos: np.ndarray, largura: int) -> np.ndarray:
+    # Textos só com dígitos e de mesmo tamanho viram uma matriz (n, largura) de inteiros
+    bytes_ = ''.join(textos).encode('ascii')
+    return (np.frombuffer(bytes_, dtype=np.uint8).reshape(-1, largura) - ord('0')).astype(np.int64)
+
+
+def _digito(soma: np.ndarray) -> np.ndarray:
+    resto = soma % 11
+    return np.where(resto < 2, 0, 11 - resto)
+
+
+def cpf_valido(digitos: np.ndarray) -> np.ndarray:
+    # digitos: matriz (n, 11)
+    d1 = (digitos[:, :9] * np.arange(10, 1, -1)).sum(axis=1) * 10 % 11 % 10
+    d2 = (digitos[:, :10] * np.arange(11, 1, -1)).sum(axis=1) * 10 % 11 % 10
+    repetido = (digitos == digitos[:, :1]).all(axis=1)
+    return (digitos[:, 9] == d1) & (digitos[:, 10] == d2) & ~repetido
+
+
+def cnpj_valido(digitos: np.ndarray) -> np.ndarray:
+    # digitos: matriz (n, 14)
+    d1 = _digito((digitos[:, :12] * PESOS_CNPJ_1).sum(axis=1))
+    d2 = _digito((digitos[:, :13] * PESOS_CNPJ_2).sum(axis=1))
+    repetido = (digitos == digitos[:, :1]).all(axis=1)
+    return (digitos[:, 12] == d1) & (digitos[:, 13] == d2) & ~repetido
+
+
+def _valores_unicos(serie: pd.Series, funcao: Callable[[pd.Series], np.ndarray]) -> np.ndarray:
+    # Valida cada valor distinto uma vez e espalha o resultado pelas linhas
+    # (um sócio aparece em vários lançamentos)
+    codigos, unicos = pd.factorize(serie)
+    resultado = np.asarray(funcao(pd.Series(unicos, dtype='string')), dtype=bool)
+    return np.where(codigos >= 0, resultado[np.maximum(codigos, 0)], False)
+
+
+def _documentos_validos(unicos: pd.Series) -> np.ndarray:
+    digitos = unicos.str.replace(r'[^0-9]', '', regex=True).fillna('')
+    tamanhos = digitos.str.len().to_numpy()
+    textos = digitos.to_numpy(dtype=object)
+    validos = np.zeros(len(unicos), dtype=bool)
+    for largura, verificar in ((11, cpf_valido), (14, cnpj_valido)):
+        selecao = tamanhos == largura
+        if selecao.any():
+            validos[selecao] = verificar(_matriz_digitos(textos[selecao], largura))
+    return validos
+
+
+def documentos_validos(serie: pd.Series) -> np.ndarray:
+    return _valores_unicos(serie, _documentos_validos)
+
+
+def normalizar_cep(serie: pd.Series) -> pd.Series:
+    # Só os dígitos, com zeros à esquerda até 8 (CEP lido como número perde o zero
+    # inicial e pode vir com '.0' no final); calculado uma vez por valor distinto
+    if pd.api.types.is_numeric_dtype(serie):
+        serie = serie.astype('Int64')
+    codigos, unicos = pd.factorize(serie)
+    texto = pd.Series(unicos, dtype='string').str.replace(r'\.0$', '', regex=True).str.replace(r'[^0-9]', '', regex=True)
+    normalizados = texto.str.zfill(8).mask(texto.fillna('') == '')
+    normalizados = pd.concat([normalizados, pd.Series([pd.NA], dtype='string')], ignore_index=True)
+    return pd.Series(normalizados.to_numpy()[codigos], index=serie.index, dtype='string')
+
+
+def ceps_validos(cep: pd.Series) -> np.ndarray:
+    # Espera o CEP já normalizado; não há CEP abaixo de 01000-000, então dois zeros
+    # no início indicam um número truncado
+    return cep.str.fullmatch(r'(?!00)\d{8}').fillna(False).to_numpy(dtype=bool)
+
+
+def emails_validos(serie: pd.Series) -> np.ndarray:
+    return _valores_unicos(serie, lambda unicos: unicos.str.strip().str.fullmatch(PADRAO_EMAIL).fillna(False))
+
+
+@metrics.etapa('validar_boletos')
+def validar_boletos(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Confere CPF/CNPJ, CEP e email de todas as linhas de uma vez; devolve as
+    # linhas aptas a virar boleto e as rejeitadas com o motivo
+    df = df.copy()
+    df['CEP'] = normalizar_cep(df['CEP'])
+
+    verificacoes = {
+        'CPF/CNPJ inválido': documentos_validos(df['Documento cliente/fornecedor']),
+        'CEP inválido': _valores_unicos(df['CEP'], ceps_validos),
+        'email inválido': emails_validos(df['Email']),
+    }
+
+    rejeitado = ~np.logical_and.reduce(list(verificacoes.values()))
+
+    # O texto do motivo só é montado para as linhas rejeitadas
+    motivo = pd.Series('', index=df.index[rejeitado], dtype=object)
+    for descricao, validos in verificacoes.items():
+        motivo = motivo.where(validos[rejeitado], motivo + descricao + '; ')
+
+    rejeitados = df[rejeitado].assign(Motivo=motivo.str[:-2])
+    return df[~rejeitado], rejeitados
+
+
+def relatorio_rejeitados(rejeitados: pd.DataFrame) -> pd.DataFrame:
+    # Uma linha por sócio rejeitado, com quantos lançamentos e quanto ficou de fora
+    return (
+        rejeitados
+        .groupby(['Cliente/Fornecedor', 'Documento cliente/fornecedor', 'Email', 'CEP', 'Motivo'], observed=True, dropna=False)
+        .agg(Lançamentos=('Valor', 'size'), Valor=('Valor', 'sum'))
+        .reset_index()
+    )
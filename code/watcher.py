@@ -0,0 +1,175 @@
+import argparse
+import fnmatch
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import generate_client_list
+import pipeline
+
+# Pastas vigiadas e o padrão de nome das exportações do Granatum em cada uma
+PASTA_LANCAMENTOS = '../update'
+PASTA_SOCIOS = '../socios'
+PADRAO_LANCAMENTOS = 'backup_granatum_*.csv'
+PADRAO_SOCIOS = 'backup_cliente_*.csv'
+
+
+class Vigia:
+    """Processa cada exportação nova assim que ela termina de ser gravada.
+
+    Usa as notificações do sistema de arquivos (watchdog, se instalado) só para
+    acordar mais cedo; a detecção em si é por varredura, então sem watchdog o
+    vigia funciona igual, por polling. Um arquivo só é processado depois de ficar
+    ``estabilidade`` segundos sem mudar de tamanho nem de data (gravação parcial).
+    """
+
+    def __init__(
+        self,
+        formato: str = 'xlsx',
+        processos: Optional[int] = None,
+        trabalhadores: int = 2,
+        intervalo: float = 5.0,
+        estabilidade: float = 2.0,
+        enviar: bool = False,
+        pular_pagos: bool = False,
+        existentes: bool = False,
+    ):
+        self.formato = formato
+        self.processos = processos
+        self.intervalo = intervalo
+        self.estabilidade = estabilidade
+        self.enviar = enviar
+        self.pular_pagos = pular_pagos
+        self.executor = ThreadPoolExecutor(max_workers=trabalhadores)
+        self.acordar = threading.Event()
+        self.parar = threading.Event()
+
+        # caminho -> (assinatura, instante em que a assinatura foi vista pela primeira vez)
+        self._observados: Dict[str, Tuple[tuple, float]] = {}
+        # caminho -> assinatura já processada
+        self._processados: Dict[str, tuple] = {} if existentes else dict(self._arquivos())
+        self._socios_em_andamento: List[Future] = []
+
+    def _arquivos(self) -> List[Tuple[str, tuple]]:
+        arquivos = []
+        for pasta, padrao in ((PASTA_SOCIOS, PADRAO_SOCIOS), (PASTA_LANCAMENTOS, PADRAO_LANCAMENTOS)):
+            if not os.path.isdir(pasta):
+                continue
+            for entrada in os.scandir(pasta):
+                if entrada.is_file() and fnmatch.fnmatch(entrada.name, padrao):
+                    estado = entrada.stat()
+                    arquivos.append((entrada.path, (estado.st_size, estado.st_mtime_ns)))
+        return arquivos
+
+    def varrer(self) -> List[str]:
+        # Devolve os arquivos que ficaram estáveis desde a última varredura e os despacha
+        agora = time.monotonic()
+        prontos = []
+        for caminho, assinatura in self._arquivos():
+            if self._processados.get(caminho) == assinatura:
+                continue
+            anterior = self._observados.get(caminho)
+            if anterior is None or anterior[0] != assinatura:
+                self._observados[caminho] = (assinatura, agora)
+                continue
+            if agora - anterior[1] >= self.estabilidade:
+                self._processados[caminho] = assinatura
+                del self._observados[caminho]
+                prontos.append(caminho)
+
+        # Sócios primeiro: os lançamentos que chegarem junto esperam a lista atualizada
+        for caminho in sorted(prontos, key=lambda c: not c.startswith(PASTA_SOCIOS)):
+            self.despachar(caminho)
+        return prontos
+
+    def despachar(self, caminho: str) -> Future:
+        nome = os.path.basename(caminho)
+        if caminho.startswith(PASTA_SOCIOS):
+            futuro = self.executor.submit(self._processar_socios, nome)
+            self._socios_em_andamento = [f for f in self._socios_em_andamento if not f.done()] + [futuro]
+        else:
+            futuro = self.executor.submit(self._processar_lancamentos, nome, list(self._socios_em_andamento))
+        futuro.add_done_callback(lambda f: self._relatar(nome, f))
+        return futuro
+
+    def _processar_socios(self, nome: str) -> None:
+        print(f'[vigia] nova exportação de sócios: {nome}')
+        if os.path.exists(generate_client_list.CAMINHO_SOCIOS):
+            generate_client_list.atualizar_lista_socios(nome)
+        else:
+            generate_client_list.generate_client_list(nome)
+
+    def _processar_lancamentos(self, nome: str, socios_pendentes: List[Future]) -> None:
+        wait(socios_pendentes)
+        print(f'[vigia] novo backup de lançamentos: {nome}')
+        args = argparse.Namespace(arquivo=nome, formato=self.formato, processos=self.processos, enviar=self.enviar,
+                                  pular_pagos=self.pular_pagos)
+        # Estado por backup, para backups diferentes poderem rodar ao mesmo tempo
+        pipeline.executar_pipeline(
+            pipeline.etapas_padrao(args, incluir_socios=False),
+            caminho_estado=os.path.join(os.path.dirname(pipeline.CAMINHO_ESTADO), f'estado_{nome}.json'),
+        )
+
+    @staticmethod
+    def _relatar(nome: str, futuro: Future) -> None:
+        if futuro.exception() is not None:
+            print(f'[vigia] falha ao processar {nome}: {futuro.exception()!r}')
+        else:
+            print(f'[vigia] {nome} processado')
+
+    def _observar(self):
+        # Notificações do sistema de arquivos, se o watchdog estiver instalado
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            print(f'[vigia] watchdog não instalado: verificando as pastas a cada {self.intervalo:g} s')
+            return None
+
+        vigia = self
+
+        class Notificacao(FileSystemEventHandler):
+            def on_any_event(self, evento) -> None:
+                vigia.acordar.set()
+
+        observador = Observer()
+        for pasta in (PASTA_LANCAMENTOS, PASTA_SOCIOS):
+            if os.path.isdir(pasta):
+                observador.schedule(Notificacao(), pasta, recursive=False)
+        observador.start()
+        return observador
+
+    def executar(self) -> None:
+        observador = self._observar()
+        print(f'[vigia] aguardando exportações em {PASTA_LANCAMENTOS} e {PASTA_SOCIOS} (Ctrl+C para sair)')
+        try:
+            while not self.parar.is_set():
+                self.varrer()
+                # Com arquivos ainda sendo gravados, volta logo para conferir se estabilizaram
+                espera = min(self.intervalo, self.estabilidade / 2) if self._observados else self.intervalo
+                self.acordar.wait(espera)
+                self.acordar.clear()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if observador is not None:
+                observador.stop()
+                observador.join()
+            print('[vigia] encerrando, aguardando os processamentos em andamento')
+            self.executor.shutdown(wait=True)
+
+
+def executar(args) -> None:
+    # Chamado pelo cli.py (subcomando vigiar); os argumentos são definidos lá
+    Vigia(
+        formato=args.formato,
+        processos=args.processos,
+        trabalhadores=args.trabalhadores,
+        intervalo=args.intervalo,
+        estabilidade=args.estabilidade,
+        enviar=args.enviar,
+        pular_pagos=args.pular_pagos,
+        existentes=args.existentes,
+    ).executar()